@@ -0,0 +1,451 @@
+import json
+import os
+import re
+import uuid
+from difflib import get_close_matches
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from excel_loader import ParsedWorkbook, load_excel_workbook
+from parse_cache import ParseCache
+
+# Logika CPP Bahan tanpa Streamlit: dipakai oleh bahan_page dan batch_cli
+#
+# Data hasil ekstraksi disimpan dalam bentuk panjang (store), satu baris per bahan per batch:
+#   store['batches']: satu baris per baris tabel lebar (Nomor Batch, No. Order Produksi, Jalur)
+#   store['items']: Baris (posisi di batches), Slot (nomor kelompok kolom, mulai 1), dan enam kolom bahan
+#   store['slots']: jumlah kelompok kolom di tabel lebar
+#   store['id']: kunci cache tabel lebar
+# Tabel lebar "Nama Bahan Formula N / Kode Bahan N / ..." hanya dibuat untuk tampilan dan ekspor.
+
+BASE_COLUMNS = ['Nomor Batch', 'No. Order Produksi', 'Jalur']
+ITEM_COLUMNS = ['Nama Bahan Formula', 'Kode Bahan', 'Kuantiti > Terpakai', 'Kuantiti > Rusak', 'No Lot Supplier', 'Label QC']
+# Kolom teks yang nilainya banyak berulang disimpan sebagai kategori
+CATEGORY_COLUMNS = ['Nama Bahan Formula', 'Kode Bahan', 'No Lot Supplier', 'Label QC']
+
+# Tabel lebar per store, dibagi oleh semua sesi dalam proses
+_wide_cache = ParseCache(max_entries=8)
+
+
+def extract_headers_from_rows_10_and_11(excel_file):
+    if isinstance(excel_file, ParsedWorkbook):
+        parsed_workbook = excel_file
+    else:
+        parsed_workbook = load_excel_workbook(excel_file)
+
+    headers = []
+    seen = {}
+
+    for col, (val_10, val_11) in enumerate(parsed_workbook.header_levels(start_row=1, num_levels=2), start=1):
+        if not val_11 or val_10 == val_11 or col <= 2:
+            header = val_10
+        else:
+            header = f"{val_10} > {val_11}"
+
+        if header in seen:
+            seen[header] += 1
+            header = f"{header}_{seen[header]}"
+        else:
+            seen[header] = 1
+
+        headers.append(header)
+
+    return headers
+
+
+def get_formula_name_from_excel(excel_file):
+    """
+    Ekstrak nama formula dari file Excel.
+    Mencari di sel-sel awal untuk menemukan nama formula/produk. Mengembalikan (nama_formula, messages).
+    """
+    try:
+        wb = load_workbook(excel_file, data_only=True)
+        ws = wb.active
+        
+        # Cari nama formula di beberapa kemungkinan lokasi
+        possible_locations = [
+            (1, 1), (1, 2), (1, 3), (1, 4),  # Baris 1
+            (2, 1), (2, 2), (2, 3), (2, 4),  # Baris 2
+            (3, 1), (3, 2), (3, 3), (3, 4),  # Baris 3
+        ]
+        
+        for row, col in possible_locations:
+            cell_value = ws.cell(row=row, column=col).value
+            if cell_value and isinstance(cell_value, str):
+                cell_value = str(cell_value).strip()
+                # Cek apakah ini seperti nama formula (mengandung kata kunci tertentu)
+                if any(keyword in cell_value.lower() for keyword in ['formula', 'produk', 'batch', 'nama']):
+                    # Ambil bagian setelah tanda ":" jika ada
+                    if ':' in cell_value:
+                        return cell_value.split(':', 1)[1].strip(), []
+                    return cell_value, []
+                # Atau jika sel berisi teks yang cukup panjang dan tidak berupa angka
+                elif len(cell_value) > 5 and not cell_value.replace('.', '').replace(',', '').isdigit():
+                    return cell_value, []
+        
+        # Jika tidak ditemukan, kembalikan default
+        return "Formula Tidak Diketahui", []
+        
+    except Exception as e:
+        return "Formula Tidak Diketahui", [("warning", f"Gagal mengekstrak nama formula: {e}")]
+
+
+# Nama kolom yang dicari di header file upload -> nama kolom standar
+HEADER_MAPPING = {
+    'Nomor Batch': 'Nomor Batch',
+    'No. Order Produksi': 'No. Order Produksi',
+    'Jalur': 'Jalur',
+    'Kode Bahan': 'Kode Bahan',
+    'Nama Bahan Formula': 'Nama Bahan Formula', # Changed from 'Nama Bahan' to 'Nama Bahan Formula'
+    'Kuantiti > Terpakai': 'Kuantiti > Terpakai',
+    'Kuantiti > Rusak': 'Kuantiti > Rusak',
+    'No Lot Supplier': 'No Lot Supplier',
+    'Label QC': 'Label QC'
+}
+
+# Varian header dari ekspor yang sudah dikenal: nama kolom standar -> daftar alias
+HEADER_ALIAS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bahan_header_aliases.json')
+
+
+def _header_key(name):
+    # Kunci pembanding header: huruf kecil, tanpa spasi dan tanda baca ("No. Batch" -> "nobatch")
+    return re.sub(r'[^0-9a-z]+', '', str(name).lower())
+
+
+@lru_cache(maxsize=None)
+def load_header_aliases(path=HEADER_ALIAS_FILE):
+    """
+    Memuat tabel alias header dari file JSON. Mengembalikan dict kunci header -> nama kolom yang dicari.
+    File yang tidak ada atau tidak valid dianggap tabel kosong.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            aliases = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return {
+        _header_key(alias): expected_col
+        for expected_col, names in aliases.items()
+        for alias in [expected_col] + list(names)
+    }
+
+
+@lru_cache(maxsize=64)
+def resolve_header_mapping(columns):
+    """
+    Menentukan rename kolom untuk satu susunan header (tuple nama kolom); hasil disimpan per susunan header.
+    Urutan pencarian untuk setiap kolom yang dicari: nama persis, lalu kunci header yang sama dengan
+    nama itu atau aliasnya, lalu difflib.get_close_matches (cutoff 0.6) sebagai cadangan.
+    Mengembalikan tuple pasangan (kolom asli, nama kolom standar).
+    """
+    aliases = load_header_aliases()
+    text_columns = [col for col in columns if isinstance(col, str)]
+
+    columns_by_key = {}
+    for col in text_columns:
+        columns_by_key.setdefault(_header_key(col), col)
+
+    new_columns = {}
+    for expected_col in HEADER_MAPPING:
+        if expected_col in text_columns:
+            match = expected_col
+        else:
+            keys = [_header_key(expected_col)] + [key for key, target in aliases.items() if target == expected_col]
+            match = next((columns_by_key[key] for key in keys if key in columns_by_key), None)
+            if match is None:
+                matches = get_close_matches(expected_col, text_columns, n=1, cutoff=0.6)
+                match = matches[0] if matches else None
+        if match is not None:
+            new_columns[match] = HEADER_MAPPING[expected_col]
+
+    return tuple(new_columns.items())
+
+
+def normalize_columns(df):
+    new_columns = dict(resolve_header_mapping(tuple(df.columns)))
+    df = df.rename(columns=new_columns)
+    return df
+
+
+# def transform_batch_data(df, formula_name="Formula Tidak Diketahui"): # OLD SIGNATURE
+def transform_batch_data(df): # NEW SIGNATURE - remove formula_name parameter
+    """
+    Transform batch data ke tabel lebar. Nama formula column is removed.
+    """
+    return _store_to_wide(build_bahan_store(df))
+
+
+def build_bahan_store(df):
+    """
+    Membuat store bentuk panjang dari data CPP Bahan yang kolomnya sudah dinormalisasi.
+    Batch diurutkan sesuai kemunculan pertama; bahan ke-N dalam batch menjadi Slot N.
+    """
+    selected_cols = [
+        'Nomor Batch',
+        'No. Order Produksi',
+        'Jalur',
+        'Kode Bahan',
+        'Nama Bahan Formula',
+        'Kuantiti > Terpakai',
+        'Kuantiti > Rusak',
+        'No Lot Supplier',
+        'Label QC'
+    ]
+
+    missing = [col for col in selected_cols if col not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom berikut tidak ditemukan dalam data: {missing}")
+
+    # Baris tanpa nomor batch tidak masuk batch mana pun
+    df = df.loc[df['Nomor Batch'].notna(), selected_cols]
+
+    # No. Order Produksi dan Jalur diambil dari baris pertama batch
+    batch_codes, _ = pd.factorize(df['Nomor Batch'])
+    items = df[ITEM_COLUMNS].reset_index(drop=True)
+    items.insert(0, 'Baris', batch_codes)
+    items.insert(1, 'Slot', df.groupby('Nomor Batch', sort=False).cumcount().to_numpy() + 1)
+    batches = df.drop_duplicates('Nomor Batch')[BASE_COLUMNS]
+
+    slots = int(items['Slot'].max()) if len(items) else 0
+    return _make_store(batches, items, slots)
+
+
+def _make_store(batches, items, slots):
+    items = items.astype({col: 'category' for col in CATEGORY_COLUMNS})
+    return {
+        'batches': batches.reset_index(drop=True),
+        'items': items.reset_index(drop=True),
+        'slots': slots,
+        'id': uuid.uuid4().hex,
+    }
+
+
+def _infer_column_types(df):
+    # Tipe tiap kolom ditentukan dari isinya (mis. kolom kuantiti tanpa sel '' tetap numerik)
+    return pd.DataFrame({col: pd.Series(df[col].to_numpy(dtype=object)).infer_objects() for col in df.columns})
+
+
+def _store_to_wide(store):
+    batches, items, slots = store['batches'], store['items'], store['slots']
+    if batches.empty:
+        return pd.DataFrame(columns=BASE_COLUMNS)
+
+    # Bahan di Slot N menjadi kelompok kolom ke-N; slot yang tidak terisi diisi ''
+    wide_items = (
+        items[ITEM_COLUMNS]
+        .astype(object)
+        .set_axis(pd.MultiIndex.from_arrays([items['Baris'], items['Slot']]), axis=0)
+        .unstack(fill_value='')
+    )
+    full_columns = pd.MultiIndex.from_tuples([(col, slot) for slot in range(1, slots + 1) for col in ITEM_COLUMNS])
+    wide_items = wide_items.reindex(index=range(len(batches)), columns=full_columns, fill_value='')
+    wide_items.columns = [f"{col} {slot}" for col, slot in full_columns]
+
+    return _infer_column_types(pd.concat([batches, wide_items.reset_index(drop=True)], axis=1))
+
+
+def bahan_wide_view(store):
+    """
+    Tabel lebar dari store untuk tampilan dan ekspor, di-cache per store.
+    Hasilnya dipakai bersama: salin dulu sebelum diubah.
+    """
+    wide = _wide_cache.get(store['id'])
+    if wide is None:
+        wide = _store_to_wide(store)
+        _wide_cache.put(store['id'], wide)
+    return wide
+
+def simplify_headers(df):
+    # Hapus penomoran di akhir kolom seperti "Kode Bahan 1" → "Kode Bahan"
+    new_cols = []
+    for col in df.columns:
+        if col in ["Nama Formula", "Nomor Batch"]:
+            new_cols.append(col)
+        else:
+            # Hilangkan angka dan spasi di akhir, tapi simpan seluruh bagian awal
+            simplified = re.sub(r"\s\d+$", "", col)
+            new_cols.append(simplified)
+    df.columns = new_cols
+    return df
+
+
+def get_unique_batch_numbers(df):
+    """
+    Mendapatkan daftar nomor batch unik dari dataframe
+    """
+    if 'Nomor Batch' in df.columns:
+        unique_batches = df['Nomor Batch'].dropna()
+        unique_batches = unique_batches[unique_batches != '']
+        return sorted(list(unique_batches.unique()))
+    return []
+
+
+def build_bahan_index(store):
+    """
+    Indeks pencarian untuk store, dibuat sekali per hasil ekstraksi/pengelompokan:
+      'materials': nama bahan -> posisi di store['items'] (urut per slot lalu per batch)
+      'batches': nomor batch -> posisi baris di tabel lebar
+      'bahan_names', 'batch_numbers': daftar unik terurut (tanpa nilai kosong) untuk pilihan filter
+    """
+    items = store['items']
+    names = items['Nama Bahan Formula']
+    codes = names.cat.codes.to_numpy()
+
+    # Posisi item diurutkan per slot lalu per batch, kemudian dikelompokkan per kode kategori nama.
+    # Kode -1 (NaN) berada di awal urutan dan dilewati
+    order = np.lexsort((items['Baris'].to_numpy(), items['Slot'].to_numpy()))
+    order = order[np.argsort(codes[order], kind='stable')]
+    counts = np.bincount(codes[codes >= 0], minlength=len(names.cat.categories))
+    ends = np.cumsum(counts) + np.count_nonzero(codes < 0)
+    materials = {
+        name: order[end - count:end]
+        for name, count, end in zip(names.cat.categories.tolist(), counts, ends)
+        if count
+    }
+
+    batches = store['batches'].groupby('Nomor Batch', sort=False).indices if len(store['batches']) else {}
+
+    return {
+        'materials': materials,
+        'batches': batches,
+        'bahan_names': sorted(name for name in materials if name != ''),
+        'batch_numbers': sorted(batch for batch in batches if batch != ''),
+    }
+
+
+def rows_for_batches(index, batch_numbers):
+    """
+    Posisi baris tabel lebar (urut) untuk daftar nomor batch, dari build_bahan_index.
+    """
+    positions = [index['batches'][batch] for batch in batch_numbers if batch in index['batches']]
+    return np.unique(np.concatenate(positions)) if positions else np.array([], dtype=np.intp)
+
+
+def create_filtered_table_by_batch(df, selected_batch, index=None):
+    """
+    Filter dataframe berdasarkan nomor batch yang dipilih
+    Jika index (build_bahan_index) diberikan, baris diambil langsung dari indeks.
+    """
+    if 'Nomor Batch' not in df.columns:
+        return pd.DataFrame()
+
+    if index is not None:
+        return df.iloc[rows_for_batches(index, [selected_batch])].copy()
+
+    # Filter berdasarkan nomor batch
+    filtered_df = df[df['Nomor Batch'] == selected_batch].copy()
+    
+    return filtered_df
+
+
+def create_filtered_table_by_name(store, selected_name, index=None):
+    """
+    Baris bahan dengan nama selected_name beserta batch-nya, diurutkan per slot lalu per batch.
+    index (build_bahan_index) sebaiknya diberikan agar tidak dibuat ulang setiap pemanggilan.
+    """
+    if index is None:
+        index = build_bahan_index(store)
+
+    positions = index['materials'].get(selected_name)
+    if positions is None:
+        return pd.DataFrame(columns=BASE_COLUMNS + ITEM_COLUMNS)
+
+    matches = store['items'].iloc[positions]
+    batches = store['batches'].iloc[matches['Baris'].to_numpy()].reset_index(drop=True)
+    return _infer_column_types(pd.concat([batches, matches[ITEM_COLUMNS].reset_index(drop=True)], axis=1))
+
+
+def get_unique_bahan_names(store):
+    # Nama bahan unik selain nilai kosong/NaN, diurutkan
+    return build_bahan_index(store)['bahan_names']
+
+
+def merge_same_materials(store):
+    """
+    Memindahkan kelompok data dengan nama bahan formula yang sama ke baris baru
+    Jika dalam satu baris ada nama bahan formula yang sama di kelompok berbeda,
+    kelompok kedua akan dipindah ke baris baru (tanpa nomor batch, no order, jalur)
+    Mengembalikan store baru (store yang sama jika tidak ada yang dipindah); jumlah slot tidak berubah.
+    """
+    batches = store['batches']
+    items = store['items'].sort_values(['Baris', 'Slot'], kind='stable')
+
+    # Nama bahan dibandingkan setelah strip; nilai kosong/NaN tidak dihitung sebagai bahan
+    names = items['Nama Bahan Formula']
+    category_keys = np.array([str(value).strip() for value in names.cat.categories], dtype=object)
+    codes = names.cat.codes.to_numpy()
+    keys = np.full(len(items), None, dtype=object)
+    keys[codes >= 0] = category_keys[codes[codes >= 0]]
+    named = (codes >= 0) & (keys != '')
+    rows = items['Baris'].to_numpy()
+
+    # Kemunculan kedua dst. dari (baris, nama) dipindah ke baris baru
+    duplicate = pd.DataFrame({'Baris': rows[named], 'nama': keys[named]}).duplicated().to_numpy()
+    moved = np.zeros(len(items), dtype=bool)
+    moved[np.flatnonzero(named)[duplicate]] = True
+    if not moved.any():
+        return store
+
+    # Baris yang punya bahan dipindah disusun ulang: bahan pertama per nama di posisi 1, 2, ...
+    # dan slot dengan nama kosong dibuang. Baris lain tidak berubah
+    regrouped = np.zeros(len(batches), dtype=bool)
+    regrouped[rows[moved]] = True
+    in_regrouped = regrouped[rows]
+    kept = in_regrouped & named & ~moved
+    unchanged = ~in_regrouped
+
+    kept_slots = pd.Series(rows[kept]).groupby(rows[kept]).cumcount().to_numpy() + 1
+    kept_index = pd.MultiIndex.from_arrays([rows[kept], keys[kept]])
+    target_slots = kept_slots[kept_index.get_indexer(pd.MultiIndex.from_arrays([rows[moved], keys[moved]]))]
+
+    # Setiap bahan yang dipindah mendapat baris baru tepat setelah baris asalnya
+    moved_per_row = np.bincount(rows[moved], minlength=len(batches))
+    new_row_positions = np.arange(len(batches)) + np.cumsum(moved_per_row) - moved_per_row
+    moved_order = pd.Series(rows[moved]).groupby(rows[moved]).cumcount().to_numpy()
+    moved_rows = new_row_positions[rows[moved]] + 1 + moved_order
+
+    new_baris = new_row_positions[rows]
+    new_baris[moved] = moved_rows
+    new_slots = items['Slot'].to_numpy().copy()
+    new_slots[kept] = kept_slots
+    new_slots[moved] = target_slots
+    new_names = names.to_numpy(dtype=object, copy=True)
+    new_names[kept | moved] = keys[kept | moved]
+
+    keep = unchanged | kept | moved
+    new_items = items[ITEM_COLUMNS].assign(**{'Nama Bahan Formula': new_names})[keep]
+    new_items.insert(0, 'Baris', new_baris[keep])
+    new_items.insert(1, 'Slot', new_slots[keep])
+    new_items = new_items.sort_values(['Baris', 'Slot'], kind='stable')
+
+    total_rows = len(batches) + int(moved.sum())
+    new_batches = {}
+    for col in BASE_COLUMNS:
+        values = np.full(total_rows, '', dtype=object)
+        values[new_row_positions] = batches[col].to_numpy(dtype=object)
+        new_batches[col] = values
+
+    return _make_store(_infer_column_types(pd.DataFrame(new_batches)), new_items, store['slots'])
+
+
+def load_bahan_dataframe(excel_file):
+    """
+    Membaca file CPP Bahan: header dari baris 1-2, data mulai baris 3.
+    Mengembalikan (df_asli, messages); messages berisi tuple (level, teks).
+    """
+    messages = []
+
+    # Parsing file sekali, dipakai untuk header (baris 1-2) dan data (mulai baris 3)
+    parsed_workbook = load_excel_workbook(excel_file)
+    combined_headers = extract_headers_from_rows_10_and_11(parsed_workbook)
+    df_asli = parsed_workbook.to_dataframe(skiprows=2)
+    if len(df_asli.columns) == len(combined_headers):
+        df_asli.columns = combined_headers
+    else:
+        messages.append(("warning", f"Jumlah header yang diekstrak ({len(combined_headers)}) tidak cocok dengan jumlah kolom data ({len(df_asli.columns)}). Menggunakan header default."))
+
+    return df_asli, messages
@@ -0,0 +1,246 @@
+"""
+Pemrosesan batch tanpa Streamlit untuk pipeline CQA, IPC, CPP Bahan, dan CQA Ekstrak.
+
+Contoh:
+    python batch_cli.py cqa data/cqa/ -o hasil/ --mode pisah
+    python batch_cli.py ipc tebal "data/ipc/*.xlsx" -o hasil/
+    python batch_cli.py bahan data/bahan/ -o hasil/ --merge
+    python batch_cli.py cqa-ekstrak data/ekstrak/ -o hasil/
+
+Input bisa berupa file, folder (semua file Excel di dalamnya), atau pola glob.
+"""
+import argparse
+import glob
+import os
+import sys
+
+import pandas as pd
+
+from bahan_core import (
+    bahan_wide_view,
+    build_bahan_store,
+    load_bahan_dataframe,
+    merge_same_materials,
+    normalize_columns,
+    simplify_headers,
+)
+from cqa_ekstrak_core import extract_cqa_files
+from cqa_loader import load_cqa_dataframe
+from ipc_core import (
+    parse_kekerasan,
+    parse_keseragaman_bobot,
+    parse_keseragaman_bobot_effervescent,
+    parse_tebal,
+    parse_waktu_hancur_friability,
+)
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls", ".ods")
+
+
+def expand_inputs(inputs, extensions=EXCEL_EXTENSIONS):
+    """
+    Mengubah daftar file/folder/pola glob menjadi daftar path file Excel (urut, tanpa duplikat).
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(os.path.join(item, name) for name in os.listdir(item))
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
+
+        for path in candidates:
+            # File kunci sementara Excel (~$...) ikut terbaca di folder yang sedang dibuka
+            name = os.path.basename(path)
+            if os.path.isfile(path) and name.lower().endswith(extensions) and not name.startswith("~$"):
+                if path not in paths:
+                    paths.append(path)
+
+    return paths
+
+
+def report(filename, messages):
+    """Mencetak pesan parser (level, teks) ke stderr."""
+    for level, text in messages:
+        print(f"[{level}] {filename}: {text}", file=sys.stderr)
+
+
+def write_excel(df, output_dir, filename, index=False):
+    path = os.path.join(output_dir, filename)
+    df.to_excel(path, index=index)
+    return path
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+# --- Pipeline per file ---
+# Setiap fungsi menerima path input dan folder output, lalu mengembalikan (list path output, messages)
+
+def run_cqa(path, output_dir, mode="gabung"):
+    df = load_cqa_dataframe(path, merge_mode=mode)
+    return [write_excel(df, output_dir, f"{_stem(path)}_cqa_{mode}.xlsx")], []
+
+
+def run_kekerasan(path, output_dir):
+    final_df, messages = parse_kekerasan(path)
+    if final_df is None:
+        return [], messages
+    return [write_excel(final_df, output_dir, f"{_stem(path)}_kekerasan.xlsx", index=True)], messages
+
+
+def run_keseragaman_bobot(path, output_dir):
+    result, messages = parse_keseragaman_bobot(path)
+    if result is None:
+        return [], messages
+    export_df = pd.concat(result)
+    return [write_excel(export_df, output_dir, f"{_stem(path)}_keseragaman_bobot.xlsx", index=True)], messages
+
+
+def run_keseragaman_bobot_effervescent(path, output_dir):
+    result_df, messages = parse_keseragaman_bobot_effervescent(path)
+    if result_df is None or result_df.empty:
+        return [], messages
+    return [write_excel(result_df, output_dir, f"{_stem(path)}_keseragaman_bobot_effervescent.xlsx")], messages
+
+
+def run_tebal(path, output_dir):
+    exportable_df, messages = parse_tebal(path)
+    if exportable_df is None:
+        return [], messages
+    return [write_excel(exportable_df, output_dir, f"{_stem(path)}_tebal.xlsx", index=True)], messages
+
+
+def run_waktu_hancur_friability(path, output_dir):
+    (waktu_hancur_df, friability_df), messages = parse_waktu_hancur_friability(path)
+    outputs = []
+    if not waktu_hancur_df.empty:
+        outputs.append(write_excel(waktu_hancur_df, output_dir, f"{_stem(path)}_waktu_hancur.xlsx"))
+    if not friability_df.empty:
+        outputs.append(write_excel(friability_df, output_dir, f"{_stem(path)}_friability.xlsx"))
+    return outputs, messages
+
+
+IPC_PIPELINES = {
+    "kekerasan": run_kekerasan,
+    "keseragaman-bobot": run_keseragaman_bobot,
+    "keseragaman-bobot-effervescent": run_keseragaman_bobot_effervescent,
+    "tebal": run_tebal,
+    "waktu-hancur-friability": run_waktu_hancur_friability,
+}
+
+
+def run_bahan(path, output_dir, merge=False):
+    df_asli, messages = load_bahan_dataframe(path)
+    bahan_store = build_bahan_store(normalize_columns(df_asli.copy()))
+    if merge:
+        bahan_store = merge_same_materials(bahan_store)
+    result_df = bahan_wide_view(bahan_store)
+    if result_df.empty:
+        messages.append(("warning", "Hasil ekstraksi data batch kosong."))
+        return [], messages
+
+    path_out = os.path.join(output_dir, f"{_stem(path)}_batch.xlsx")
+    with pd.ExcelWriter(path_out, engine='openpyxl') as writer:
+        simplify_headers(result_df.copy()).to_excel(writer, index=False, sheet_name='Batch Data')
+    return [path_out], messages
+
+
+def process_each(paths, output_dir, pipeline, **options):
+    """
+    Menjalankan pipeline untuk setiap file. Error di satu file tidak menghentikan file lain.
+    Mengembalikan jumlah file yang gagal.
+    """
+    failed = 0
+    for path in paths:
+        try:
+            outputs, messages = pipeline(path, output_dir, **options)
+        except Exception as e:
+            outputs, messages = [], [("error", f"Gagal memproses file: {e}")]
+
+        report(path, messages)
+        if outputs:
+            for output in outputs:
+                print(f"{path} -> {output}")
+        else:
+            failed += 1
+            print(f"[gagal] {path}: tidak ada output", file=sys.stderr)
+
+    return failed
+
+
+def run_cqa_ekstrak(paths, output_dir, mode="gabung", jobs=1):
+    """
+    CQA Ekstrak menggabungkan semua file input (sesuai urutan) menjadi satu workbook.
+    Mengembalikan jumlah file yang gagal.
+    """
+    result = extract_cqa_files(paths, column_mode=mode, max_workers=jobs)
+    report("cqa-ekstrak", result['messages'])
+    for error in result['error_files']:
+        print(f"[gagal] {error['file']}: {error['error']}", file=sys.stderr)
+
+    if result['processed_df'].empty:
+        print("[gagal] cqa-ekstrak: tidak ada data yang dapat diproses untuk transpose", file=sys.stderr)
+        return max(len(result['error_files']), 1)
+
+    path_out = os.path.join(output_dir, f"cqa_ekstrak_{mode}.xlsx")
+    with pd.ExcelWriter(path_out, engine='openpyxl') as writer:
+        result['combined_df'].to_excel(writer, sheet_name='Data_Asli_Gabungan', index=False)
+        result['processed_df'].to_excel(writer, sheet_name='Hasil_Transpose', index=False)
+    print(f"{len(result['all_data'])} file -> {path_out}")
+    return len(result['error_files'])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pemrosesan batch file CQA, IPC, dan CPP Bahan tanpa Streamlit.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub):
+        sub.add_argument("inputs", nargs="+", help="File, folder, atau pola glob file Excel")
+        sub.add_argument("-o", "--output-dir", default="output", help="Folder output (default: output)")
+
+    cqa = subparsers.add_parser("cqa", help="Critical Quality Attribute (CQA)")
+    add_common(cqa)
+    cqa.add_argument("--mode", choices=["gabung", "pisah"], default="gabung", help="Penanganan kolom [Nilai]/[Teks]")
+
+    ipc = subparsers.add_parser("ipc", help="In Process Control (IPC)")
+    ipc.add_argument("test", choices=sorted(IPC_PIPELINES), help="Jenis pengujian")
+    add_common(ipc)
+
+    bahan = subparsers.add_parser("bahan", help="CPP Bahan (ekstraksi data batch)")
+    add_common(bahan)
+    bahan.add_argument("--merge", action="store_true", help="Kelompokkan bahan yang sama ke baris baru")
+
+    ekstrak = subparsers.add_parser("cqa-ekstrak", help="CQA Ekstrak (gabungan semua file)")
+    add_common(ekstrak)
+    ekstrak.add_argument("--mode", choices=["gabung", "pisah"], default="gabung", help="Penanganan kolom [Nilai]/[Teks]")
+    ekstrak.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Jumlah proses paralel (default: jumlah CPU)")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("Tidak ada file Excel yang cocok dengan input.", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.command == "cqa":
+        failed = process_each(paths, args.output_dir, run_cqa, mode=args.mode)
+    elif args.command == "ipc":
+        failed = process_each(paths, args.output_dir, IPC_PIPELINES[args.test])
+    elif args.command == "bahan":
+        failed = process_each(paths, args.output_dir, run_bahan, merge=args.merge)
+    else:
+        failed = run_cqa_ekstrak(paths, args.output_dir, mode=args.mode, jobs=args.jobs)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+import re
+
+from excel_loader import load_excel_workbook, read_file_bytes
+from utils import combine_duplicate_columns
+
+# Logika CQA Ekstrak tanpa Streamlit: dipakai oleh cqa_ekstrak dan batch_cli
+
+
+def handle_duplicate_columns(df, mode="gabung"):
+    """
+    Menangani kolom duplikat berdasarkan mode yang dipilih
+    
+    Args:
+        df: DataFrame input
+        mode: "gabung" untuk menggabungkan kolom dengan nama dasar sama,
+              "pisah" untuk menggabungkan hanya kolom dengan nama persis sama
+    """
+    return combine_duplicate_columns(df, mode=mode)
+
+def clean_data_value(value):
+    """
+    Membersihkan nilai data dari tag [Nilai] atau [Teks]
+    """
+    return re.sub(r"\s*\[.*?\]\s*$", "", str(value)).strip()
+
+def process_data_with_stacking(all_data, column_mode="gabung"):
+    """
+    Memproses data dengan stacking dan menangani nilai data yang memiliki [Nilai]/[Teks]
+    
+    Args:
+        all_data: List data dari semua file
+        column_mode: Mode penanganan data ("gabung" atau "pisah")
+    """
+    if not all_data:
+        return pd.DataFrame()
+    
+    # Tahap 1: Kumpulkan semua nilai unik dari kolom A
+    all_a_values = []
+    seen_values = set()
+    # Hasil clean_data_value per teks, dipakai ulang di semua file
+    cleaned = {}
+    
+    for file_data in all_data:
+        df = file_data['data']
+        if not df.empty:
+            col_a = df.columns[0]
+            for val in df[col_a].dropna():
+                val_str = str(val).strip()
+                if val_str != '':
+                    if column_mode == "gabung":
+                        # Untuk mode gabung, bersihkan dari [Nilai]/[Teks]
+                        cleaned_val = _clean_cached(val_str, cleaned)
+                        if cleaned_val not in seen_values:
+                            all_a_values.append(cleaned_val)
+                            seen_values.add(cleaned_val)
+                    else:
+                        # Untuk mode pisah, gunakan nilai asli
+                        if val_str not in seen_values:
+                            all_a_values.append(val_str)
+                            seen_values.add(val_str)
+    
+    if not all_a_values:
+        return pd.DataFrame()
+    
+    # Tahap 2: per file, nilai G & H dikelompokkan sekali per kunci kolom A
+    headers = []
+    joined_per_file = []
+    for file_data in all_data:
+        df = file_data['data']
+        if df.empty:
+            continue
+        
+        # Terapkan mode penanganan kolom duplikat pada header (pakai hasil extract_cqa_files jika ada)
+        df_processed = file_data.get('processed')
+        if df_processed is None:
+            df_processed = handle_duplicate_columns(df, mode=column_mode)
+        
+        # Karena G dan H sekarang memiliki header yang sama setelah merge,
+        # kita hanya perlu satu header untuk keduanya
+        headers.append("Nilai & Teks Hasil Uji")
+        joined_per_file.append(_join_values_by_key(df_processed, column_mode, cleaned))
+    
+    transpose_data = {'Header': headers}
+    for a_val in all_a_values:
+        transpose_data[a_val] = [joined.get(a_val, '') for joined in joined_per_file]
+    
+    result_df = pd.DataFrame(transpose_data)
+    
+    return result_df
+
+def _clean_cached(text, cleaned):
+    if text not in cleaned:
+        cleaned[text] = clean_data_value(text)
+    return cleaned[text]
+
+def _join_values_by_key(df_processed, column_mode, cleaned):
+    """
+    Menggabungkan nilai kolom G & H (dipisah koma) untuk setiap nilai kolom A dalam satu file.
+    Urutan: semua nilai G dari baris yang cocok, lalu semua nilai H; nilai kosong dilewati.
+    
+    Returns:
+        dict kunci kolom A -> string gabungan
+    """
+    col_names = df_processed.columns.tolist()
+    col_a = col_names[0]
+    
+    # Ambil kolom kedua dan ketiga (atau yang tersedia) - ini adalah G dan H
+    col_g = col_names[1] if len(col_names) > 1 else col_names[0]
+    col_h = col_names[2] if len(col_names) > 2 else (col_names[1] if len(col_names) > 1 else col_names[0])
+    
+    # Kunci dihitung sekali per baris (regex hanya sekali per nilai unik)
+    if column_mode == "gabung":
+        # Untuk mode gabung, nama dasar tanpa [Nilai]/[Teks]
+        present = df_processed[col_a].notna().tolist()
+        keys = [
+            _clean_cached(str(x), cleaned) if is_present else None
+            for x, is_present in zip(df_processed[col_a].tolist(), present)
+        ]
+    else:
+        # Untuk mode pisah, hanya teks yang persis sama
+        keys = [x if isinstance(x, str) else None for x in df_processed[col_a].tolist()]
+    
+    # Indeks hash kunci -> daftar nilai, diisi dalam satu lintasan per kolom
+    grouped = {}
+    for col in (col_g, col_h):
+        values = df_processed[col]
+        for key, val, is_present in zip(keys, values.tolist(), values.notna().tolist()):
+            if key is None or not is_present:
+                continue
+            val_str = str(val)
+            if val_str.strip() != '':
+                grouped.setdefault(key, []).append(val_str)
+    
+    return {key: ', '.join(values) for key, values in grouped.items()}
+
+def read_excel_with_merged_headers(file, target_columns=[0, 6, 7]):
+    """
+    Membaca file Excel dengan header yang mungkin di-merge
+    Tetap ambil kolom A, G, H secara terpisah dulu untuk memastikan data tidak hilang
+    """
+    # Parsing file sekali, dipakai untuk header dan data
+    parsed_workbook = load_excel_workbook(file)
+    
+    headers = []
+    for col_idx in target_columns:
+        header_value = parsed_workbook.cell_value(1, col_idx+1)
+        if header_value is None or str(header_value).strip() == '':
+            header_value = parsed_workbook.cell_value(2, col_idx+1)
+        
+        if header_value is None:
+            if col_idx == 0:
+                header_value = f"Column_A"
+            elif col_idx == 6:
+                header_value = "Nilai & Teks Hasil Uji"  # Header untuk kolom G (merged)
+            else:
+                header_value = "Nilai & Teks Hasil Uji"  # Header untuk kolom H (merged)
+        
+        headers.append(str(header_value).strip())
+    
+    df = parsed_workbook.to_dataframe(skiprows=2)
+    df_selected = df.iloc[:, target_columns].copy()
+    df_selected.columns = headers
+    df_selected = df_selected.dropna(how='all').reset_index(drop=True)
+    
+    return df_selected, headers
+
+def file_display_name(file):
+    """
+    Nama file untuk ditampilkan: atribut name (UploadedFile Streamlit) atau nama dari path
+    """
+    name = getattr(file, "name", None) or str(file)
+    return os.path.basename(name)
+
+def _read_cqa_file(file, filename, column_mode):
+    """
+    Membaca satu file CQA. Dipakai langsung (mode berurutan) atau di proses worker
+    (mode paralel), sehingga hasilnya hanya berisi objek yang bisa di-pickle.
+
+    Returns:
+        tuple (file_data atau None, error atau None, messages)
+    """
+    messages = []
+    try:
+        try:
+            df_data, headers = read_excel_with_merged_headers(file)
+        except Exception as e:
+            messages.append(("error", f"Error membaca file: {str(e)}"))
+            df_data, headers = None, None
+
+        if df_data is None or df_data.empty:
+            return None, {'file': filename, 'error': 'Tidak ada data ditemukan atau file kosong'}, messages
+
+        file_data = {
+            'filename': filename,
+            'data': df_data,
+            'headers': headers,
+            'processed': handle_duplicate_columns(df_data, mode=column_mode)
+        }
+        return file_data, None, messages
+
+    except Exception as e:
+        messages.append(("error", f"Error memproses {filename}: {str(e)}"))
+        return None, {'file': filename, 'error': str(e)}, messages
+
+def _iter_cqa_files(files_to_process_ordered, column_mode, progress_callback, max_workers):
+    """
+    Menghasilkan hasil _read_cqa_file untuk setiap file sesuai urutan file.
+    Dengan max_workers > 1 file dibaca paralel di process pool; hasil tetap
+    dikirim berurutan begitu file tersebut (dan semua file sebelumnya) selesai.
+    """
+    total = len(files_to_process_ordered)
+    filenames = [file_display_name(file) for file in files_to_process_ordered]
+
+    if max_workers is None or max_workers <= 1 or total <= 1:
+        for i, (file, filename) in enumerate(zip(files_to_process_ordered, filenames)):
+            if progress_callback is not None:
+                progress_callback(i, total, filename)
+            yield _read_cqa_file(file, filename, column_mode)
+        return
+
+    # UploadedFile Streamlit tidak bisa dikirim ke proses lain, jadi yang dikirim isi filenya.
+    # Path cukup dikirim apa adanya dan dibaca di worker
+    contents = [
+        file if isinstance(file, (str, os.PathLike)) else read_file_bytes(file)
+        for file in files_to_process_ordered
+    ]
+    workers = min(max_workers, len(contents))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_read_cqa_file, contents, filenames, repeat(column_mode))
+        for i, (filename, result) in enumerate(zip(filenames, results)):
+            if progress_callback is not None:
+                progress_callback(i, total, filename)
+            yield result
+
+def extract_cqa_files(files_to_process_ordered, column_mode="gabung", progress_callback=None, max_workers=1):
+    """
+    Membaca dan menggabungkan file-file CQA sesuai urutan
+    
+    Args:
+        files_to_process_ordered: list file (path atau file-like)
+        column_mode: Mode penanganan kolom ("gabung" atau "pisah")
+        progress_callback: fungsi opsional (indeks, jumlah_file, nama_file); mode berurutan
+            memanggilnya sebelum tiap file diproses, mode paralel setelah hasil file diterima
+        max_workers: jumlah proses untuk membaca file secara paralel (1 = berurutan)
+    
+    Returns:
+        dict dengan all_data, error_files, combined_df, processed_df, dan messages
+        (list tuple (level, teks))
+    """
+    all_data = []
+    error_files = []
+    messages = []
+
+    file_results = _iter_cqa_files(files_to_process_ordered, column_mode, progress_callback, max_workers)
+    for file_data, error, file_messages in file_results:
+        messages.extend(file_messages)
+        if error is not None:
+            error_files.append(error)
+        else:
+            all_data.append(file_data)
+
+    combined_df = None
+    processed_df = pd.DataFrame()
+    if all_data:
+        # Gabungkan data dengan mode yang dipilih
+        combined_df = pd.concat([file_data['processed'] for file_data in all_data], ignore_index=True)
+        processed_df = process_data_with_stacking(all_data, column_mode)
+
+    return {
+        'all_data': all_data,
+        'error_files': error_files,
+        'combined_df': combined_df,
+        'processed_df': processed_df,
+        'messages': messages,
+    }
@@ -0,0 +1,53 @@
+from excel_loader import load_excel_workbook
+from header_parser import combine_header_levels
+from utils import coerce_decimal_columns, combine_duplicate_columns, compact_batch_blocks
+
+
+def load_cqa_dataframe(excel_file, merge_mode="gabung"):
+    """
+    Membaca file CQA (header bertingkat baris 4-6, data mulai baris 7) dan membersihkannya.
+
+    Parameters:
+    excel_file: path, bytes, atau file-like berisi file Excel
+    merge_mode (str): "gabung" atau "pisah", diteruskan ke combine_duplicate_columns
+
+    Returns:
+    DataFrame: data CQA yang sudah dibersihkan
+    """
+    # Parsing file sekali, dipakai untuk header dan data
+    parsed_workbook = load_excel_workbook(excel_file)
+
+    # Ambil header dari baris 4-6
+    combined_headers = combine_header_levels(parsed_workbook.header_levels(start_row=4, num_levels=3), keep_empty_levels=True)
+
+    # Baca data Excel (mulai dari baris ke-7)
+    df = parsed_workbook.to_dataframe(skiprows=6)
+    df.columns = combined_headers
+
+    # Deteksi dan konversi otomatis ke float
+    df = coerce_decimal_columns(df, threshold=0.3)
+
+    # Hapus baris yang mengandung 'Rata-rata', 'SD', atau 'RSD' di kolom A
+    df = df[~df.iloc[:, 0].astype(str).str.contains("Average|SD|UCL", na=False)]
+
+    # Gabungkan kolom duplikat berdasarkan mode yang dipilih
+    df = combine_duplicate_columns(df, mode=merge_mode)
+
+    # Reset index
+    df = df.reset_index(drop=True)
+
+    # Perbaiki data kosong dalam batch (geser nilai ke atas di dalam tiap blok batch)
+    df = compact_batch_blocks(df, batch_column="Nomor Batch")
+
+    # Isi Nomor Batch kosong dari atas
+    if "Nomor Batch" in df.columns:
+        df["Nomor Batch"] = df["Nomor Batch"].ffill()
+
+    # Hapus baris kosong semua
+    df = df.dropna(how="all")
+
+    # Hapus baris yang cuma punya Nomor Batch saja
+    cols_to_check = [col for col in df.columns if col != "Nomor Batch"]
+    df = df.dropna(subset=cols_to_check, how="all")
+
+    return df
@@ -0,0 +1,179 @@
+import datetime
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+
+# Ekspor xlsx bersama untuk semua tombol download. Workbook dibuat dalam mode write-only:
+# baris ditulis bertahap dan tidak disimpan sebagai objek sel di memori, lalu hasilnya
+# dikembalikan sebagai bytes untuk st.download_button (tanpa link data-URI base64).
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Jumlah baris yang dikonversi sekaligus dari DataFrame ke nilai Python
+CHUNK_ROWS = 5000
+
+# Gaya header/index sama dengan DataFrame.to_excel
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(*(Side(style="thin"),) * 4)
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+HEADER_STYLE_NAME = "Header Ekspor"
+
+_PLAIN_TYPES = (str, int, float, bool, datetime.datetime, datetime.date, datetime.time, datetime.timedelta)
+
+
+class _StyleRegistry:
+    """
+    Named style per kombinasi (fill, alignment) yang dipakai di workbook. Style didaftarkan sekali;
+    setiap sel hanya diberi nama style-nya (cell.style = nama), tanpa membuat Font/Fill/Border baru
+    per sel. Kunci memakai identitas objek: pemanggil sebaiknya memakai ulang objek PatternFill
+    yang sama untuk warna yang sama.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._styles = {}
+
+    def _register(self, key, style):
+        wb = self.ws.parent
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+        self._styles[key] = style.name
+        return style.name
+
+    def style_for(self, fill, alignment):
+        key = (id(fill), id(alignment))
+        if key not in self._styles:
+            style = NamedStyle(name=f"Ekspor {len(self.ws.parent.named_styles)}")
+            if fill is not None:
+                style.fill = fill
+            if alignment is not None:
+                style.alignment = alignment
+            self._register(key, style)
+            # Objek fill/alignment disimpan agar id-nya tidak dipakai ulang selama ekspor
+            self._styles[(key, "objek")] = (fill, alignment)
+        return self._styles[key]
+
+    def header_style(self):
+        if "header" not in self._styles:
+            style = NamedStyle(
+                name=HEADER_STYLE_NAME, font=_HEADER_FONT, border=_HEADER_BORDER, alignment=_HEADER_ALIGNMENT
+            )
+            self._register("header", style)
+        return self._styles["header"]
+
+    def cell(self, value, style_name):
+        cell = WriteOnlyCell(self.ws, value=value)
+        cell.style = style_name
+        return cell
+
+
+def _header_cell(styles, value):
+    return styles.cell(_cell_value(value), styles.header_style())
+
+
+def _cell_value(value):
+    # Konversi nilai seperti DataFrame.to_excel: kosong untuk NaN/NA/NaT, "inf" untuk tak hingga,
+    # tipe lain (mis. list) ditulis sebagai teks
+    if value is None or (not isinstance(value, (list, tuple, np.ndarray)) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, float) and np.isinf(value):
+        return "inf" if value > 0 else "-inf"
+    if isinstance(value, _PLAIN_TYPES):
+        return value
+    return str(value)
+
+
+def _column_values(column):
+    # Kolom float dikonversi sekaligus; kolom lain per nilai dengan _cell_value
+    if pd.api.types.is_float_dtype(column.dtype):
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        if np.isfinite(values[~np.isnan(values)]).all():
+            return [None if value != value else value for value in values.tolist()]
+    return [_cell_value(value) for value in column.tolist()]
+
+
+def _styled(styles, value, fill, alignment):
+    if fill is None and alignment is None:
+        return value
+    return styles.cell(value, styles.style_for(fill, alignment))
+
+
+def write_sheet(wb, sheet_name, df, index=False, row_fills=None, column_fills=None, alignment=None):
+    """
+    Menulis DataFrame ke sheet baru pada workbook write-only.
+
+    Parameters:
+    wb (Workbook): workbook openpyxl dengan write_only=True
+    sheet_name (str): nama sheet
+    df (DataFrame): data yang ditulis (header = nama kolom)
+    index (bool): tulis index sebagai kolom pertama, seperti to_excel(index=True)
+    row_fills (list): PatternFill (atau None) per baris data, diterapkan ke semua sel di baris itu
+    column_fills (dict): nama kolom -> list PatternFill (atau None) per baris data
+    alignment (Alignment): perataan untuk semua sel data
+    """
+    ws = wb.create_sheet(title=sheet_name)
+    styles = _StyleRegistry(ws)
+
+    header = [_header_cell(styles, column) for column in df.columns]
+    if index:
+        header.insert(0, _header_cell(styles, df.index.name) if df.index.name is not None else None)
+    ws.append(header)
+
+    fill_positions = {df.columns.get_loc(column): fills for column, fills in (column_fills or {}).items()}
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        columns = [_column_values(chunk.iloc[:, pos]) for pos in range(chunk.shape[1])]
+        index_values = [_cell_value(value) for value in chunk.index.tolist()] if index else None
+
+        rows = zip(*columns) if columns else [()] * len(chunk)
+        for offset, row in enumerate(rows):
+            row_pos = start + offset
+            row_fill = row_fills[row_pos] if row_fills is not None else None
+            if row_fill is None and not fill_positions and alignment is None:
+                cells = list(row)
+            else:
+                cells = [
+                    _styled(styles, value, fill_positions[pos][row_pos] if pos in fill_positions else row_fill, alignment)
+                    for pos, value in enumerate(row)
+                ]
+            if index:
+                cells.insert(0, _header_cell(styles, index_values[offset]))
+            ws.append(cells)
+
+    return ws
+
+
+def sheets_to_xlsx_bytes(sheets, index=False):
+    """
+    Menulis beberapa DataFrame ke satu file xlsx dan mengembalikan isinya sebagai bytes.
+
+    Parameters:
+    sheets (list): daftar (nama sheet, DataFrame) atau (nama sheet, DataFrame, opsi write_sheet)
+    index (bool): default opsi index untuk semua sheet
+    """
+    wb = Workbook(write_only=True)
+    for sheet in sheets:
+        sheet_name, df = sheet[0], sheet[1]
+        options = {"index": index, **(sheet[2] if len(sheet) > 2 else {})}
+        write_sheet(wb, sheet_name, df, **options)
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def to_xlsx_bytes(df, sheet_name="Sheet1", index=False, row_fills=None, column_fills=None, alignment=None):
+    """
+    Menulis satu DataFrame ke file xlsx (bytes) untuk st.download_button.
+    Opsi row_fills/column_fills/alignment sama dengan write_sheet.
+    """
+    options = {"row_fills": row_fills, "column_fills": column_fills, "alignment": alignment}
+    return sheets_to_xlsx_bytes([(sheet_name, df, options)], index=index)
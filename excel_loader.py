@@ -0,0 +1,138 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+from header_parser import read_header_levels
+
+
+def read_file_bytes(file):
+    """
+    Mengambil isi file (path, bytes, BytesIO, atau UploadedFile Streamlit) sebagai bytes.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    content = file.read()
+    file.seek(0)
+    return content
+
+
+def _convert_cell(cell):
+    # Konversi nilai sel mengikuti pembaca openpyxl milik pandas.read_excel
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def _trim_sheet_rows(rows):
+    # Buang sel kosong di ujung baris dan baris kosong di akhir sheet, lalu samakan lebar
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(rows):
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = row_number
+        data.append(row)
+
+    data = data[: last_row_with_data + 1]
+
+    if data:
+        max_width = max(len(row) for row in data)
+        data = [row + [""] * (max_width - len(row)) for row in data]
+
+    return data
+
+
+class ParsedWorkbook:
+    """
+    Hasil parsing satu file Excel yang dipakai bersama untuk header dan data.
+    File hanya di-decode satu kali; header (dengan info merged cell) dan DataFrame
+    data sama-sama dibaca dari hasil parsing tersebut.
+    """
+
+    def __init__(self, rows, worksheet=None):
+        self.rows = rows
+        self.worksheet = worksheet
+
+    @property
+    def max_column(self):
+        if self.worksheet is not None:
+            return self.worksheet.max_column
+        return len(self.rows[0]) if self.rows else 0
+
+    def cell_value(self, row, column):
+        """Nilai mentah sel (1-based, seperti openpyxl)."""
+        if self.worksheet is not None:
+            return self.worksheet.cell(row=row, column=column).value
+        if row <= len(self.rows) and column <= len(self.rows[row - 1]):
+            value = self.rows[row - 1][column - 1]
+            return None if value == "" or pd.isna(value) else value
+        return None
+
+    def header_levels(self, start_row, num_levels):
+        """Level header per kolom, merged cell diarahkan ke sel anchor-nya."""
+        if self.worksheet is not None:
+            return read_header_levels(self.worksheet, start_row, num_levels)
+
+        levels_per_col = []
+        for col in range(1, self.max_column + 1):
+            levels = []
+            for row in range(start_row, start_row + num_levels):
+                value = self.cell_value(row, col)
+                levels.append(str(value).strip() if value else "")
+            levels_per_col.append(levels)
+        return levels_per_col
+
+    def to_dataframe(self, skiprows=0):
+        """
+        DataFrame data tanpa header, setara pd.read_excel(file, header=None, skiprows=skiprows).
+        """
+        try:
+            parser = TextParser(
+                [list(row) for row in self.rows],
+                header=None,
+                skiprows=skiprows,
+                skip_blank_lines=False,
+            )
+            return parser.read()
+        except EmptyDataError:
+            return pd.DataFrame()
+
+
+def load_excel_workbook(file):
+    """
+    Parsing file Excel satu kali dan kembalikan ParsedWorkbook.
+    File .xlsx dibaca dengan openpyxl (merged cell tersedia); format lain seperti .ods
+    jatuh ke pd.read_excel tanpa informasi merged cell.
+    """
+    content = read_file_bytes(file)
+
+    try:
+        wb = load_workbook(io.BytesIO(content), data_only=True)
+    except Exception:
+        raw = pd.read_excel(io.BytesIO(content), header=None)
+        rows = raw.astype(object).where(raw.notna(), "").values.tolist()
+        return ParsedWorkbook(_trim_sheet_rows(rows))
+
+    ws = wb.active
+    rows = [[_convert_cell(cell) for cell in row] for row in ws.rows]
+    return ParsedWorkbook(_trim_sheet_rows(rows), worksheet=ws)
@@ -6,6 +6,11 @@ from openpyxl import load_workbook
 import re
 import os
 
+from excel_export import to_xlsx_bytes
+from parse_cache import read_csv_cached, read_excel_cached
+from table_view import render_table
+from utils import compact_batch_blocks
+
 
 def filter_labelqc():
     st.subheader("Upload File Ekstra Data Batch CPP Bahan")
@@ -13,16 +18,16 @@ def filter_labelqc():
 
     if uploaded_file is not None:
         try:
-            # Baca file
+            # Baca file (hasil parsing di-cache berdasarkan isi file)
             if uploaded_file.name.endswith('.csv'):
-                df_asli = pd.read_csv(uploaded_file)
+                df_asli = read_csv_cached(uploaded_file)
             else:
-                df_asli = pd.read_excel(uploaded_file)
+                df_asli = read_excel_cached(uploaded_file)
 
             df_asli.columns = df_asli.columns.str.strip()
             st.success("✅ File berhasil dimuat.")
             st.subheader("📄 Data Excel Asli")
-            st.dataframe(df_asli)
+            render_table(df_asli, key="labelqc_asli")
 
             # Temukan semua pasangan kolom "Kode Bahan.X" dan "Label QC.X"
             kode_bahan_pairs = []
@@ -86,85 +91,63 @@ def filter_labelqc():
             
             # Tampilkan ringkasan untuk semua kode bahan
             st.subheader("🧾 Ringkasan Label QC untuk Semua Kode Bahan")
-            st.dataframe(grouped_all_df)       
+            render_table(grouped_all_df, key="labelqc_ringkasan")       
             
             # Fitur Download Ringkasan untuk semua kode bahan
             if not grouped_all_df.empty:
                 def to_excel(df):
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                        df.to_excel(writer, index=False, sheet_name="Label QC")
-                    output.seek(0)
-                    return output
+                    return to_xlsx_bytes(df, sheet_name="Label QC")
 
                 # Tambahan fungsi ekspor dengan warna
                 def to_excel_with_color(df, color_column="Label QC"):
                     import re
                     from openpyxl.styles import PatternFill
                     import colorsys
-                    output = io.BytesIO()
-                
-                    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                        df.to_excel(writer, index=False, sheet_name="Label QC")
-                        wb = writer.book
-                        ws = writer.sheets["Label QC"]
-                
-                        col_idx = df.columns.get_loc(color_column) + 1
-                
-                        for row_idx, val in enumerate(df[color_column], start=2):
-                            label_str = str(val).strip().upper()
-                
-                            match = re.match(r"(\d+)([A-Z]?)", label_str)
-                            if not match:
-                                continue
-                
-                            angka = int(match.group(1))
-                            huruf = match.group(2)
+
+                    def label_fill(label_str):
+                        match = re.match(r"(\d+)([A-Z]?)", label_str)
+                        if not match:
+                            return None
                 
-                            hue = 190 + (angka % 10) * 8 
-                            # Lightness berdasarkan huruf: A=75%, B=70%, ..., Z=45%
-                            lightness = 75 - (ord(huruf) - ord("A")) * 2.5 if huruf else 75
-                            lightness = max(45, min(75, lightness))  # dibatasi biar ga terlalu gelap/terang
-                            saturation = 0.9  # selalu 90% saturasi
+                        angka = int(match.group(1))
+                        huruf = match.group(2)
                 
-                            # Konversi HSL ke RGB (0–255)
-                            r, g, b = colorsys.hls_to_rgb(hue / 360, lightness / 100, saturation)
-                            r = int(r * 255)
-                            g = int(g * 255)
-                            b = int(b * 255)
-                            hex_color = f"FF{r:02X}{g:02X}{b:02X}"
+                        hue = 190 + (angka % 10) * 8 
+                        # Lightness berdasarkan huruf: A=75%, B=70%, ..., Z=45%
+                        lightness = 75 - (ord(huruf) - ord("A")) * 2.5 if huruf else 75
+                        lightness = max(45, min(75, lightness))  # dibatasi biar ga terlalu gelap/terang
+                        saturation = 0.9  # selalu 90% saturasi
                 
-                            # Apply warna ke cell
-                            fill = PatternFill(start_color=hex_color, end_color=hex_color, fill_type="solid")
-                            ws.cell(row=row_idx, column=col_idx).fill = fill
+                        # Konversi HSL ke RGB (0–255)
+                        r, g, b = colorsys.hls_to_rgb(hue / 360, lightness / 100, saturation)
+                        r = int(r * 255)
+                        g = int(g * 255)
+                        b = int(b * 255)
+                        hex_color = f"FF{r:02X}{g:02X}{b:02X}"
+                        return PatternFill(start_color=hex_color, end_color=hex_color, fill_type="solid")
+
+                    # Warna dihitung sekali per Label QC yang berbeda; baris dengan label sama memakai
+                    # objek PatternFill yang sama sehingga ekspor hanya membuat satu style per label
+                    labels = [str(val).strip().upper() for val in df[color_column]]
+                    fill_per_label = {label: label_fill(label) for label in set(labels)}
+                    fills = [fill_per_label[label] for label in labels]
                 
-                    output.seek(0)
-                    return output
+                    return to_xlsx_bytes(df, sheet_name="Label QC", column_fills={color_column: fills})
 
                 # Tombol download Excel Kode Bahan
                 def to_excel_styled(df):
                     from openpyxl.styles import PatternFill
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                        df.to_excel(writer, index=False, sheet_name="Kode Bahan")
-                        wb = writer.book
-                        ws = writer.sheets["Kode Bahan"]
-                
-                        gray1 = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-                        gray2 = PatternFill(start_color="BBBBBB", end_color="BBBBBB", fill_type="solid")
                 
-                        jumlah_idx = df.columns.get_loc("Jumlah Batch") + 1
-                        fill = gray1
+                    gray1 = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+                    gray2 = PatternFill(start_color="BBBBBB", end_color="BBBBBB", fill_type="solid")
                 
-                        for row in range(2, len(df) + 2):
-                            val = ws.cell(row=row, column=jumlah_idx).value
-                            for col in range(1, len(df.columns) + 1):
-                                ws.cell(row=row, column=col).fill = fill
-                            if val:
-                                fill = gray2 if fill == gray1 else gray1
+                    # Warna baris berganti setelah baris yang berisi "Jumlah Batch" (akhir kelompok):
+                    # paritas jumlah akhir kelompok sebelum setiap baris menentukan warnanya
+                    group_end = df["Jumlah Batch"].fillna("").astype(str).ne("").to_numpy(dtype=np.int64)
+                    parity = (np.cumsum(group_end) - group_end) % 2
+                    row_fills = [(gray1, gray2)[p] for p in parity]
                 
-                    output.seek(0)
-                    return output
+                    return to_xlsx_bytes(df, sheet_name="Kode Bahan", row_fills=row_fills)
                 
                 excel_all_grouped = to_excel(grouped_all_df)
                 st.download_button(
@@ -187,25 +170,22 @@ def filter_labelqc():
             # Tambahkan kolom prefix bulan dari nomor batch (misal: 'AUG24' dari 'AUG24A01')
             summary_by_kode["Prefix Bulan"] = summary_by_kode[batch_col_primary].str.extract(r'^([A-Z]{3}\d{2})')
             
-            # Inisialisasi kolom Jumlah Batch kosong
-            summary_by_kode["Jumlah Batch"] = ""
-            
             # Grup berdasarkan: Kode Bahan, Label QC, dan Prefix Bulan
-            grouped = summary_by_kode.groupby(["Kode Bahan", "Label QC", "Prefix Bulan"])
-            
-            # Isi jumlah batch hanya di baris terakhir per grup
-            for _, group_indices in grouped.groups.items():
-                group_rows = summary_by_kode.loc[group_indices]
-                jumlah = group_rows[batch_col_primary].nunique()
-                last_index = group_rows.index[-1]
-                summary_by_kode.at[last_index, "Jumlah Batch"] = f"{jumlah} batch"
+            group_keys = ["Kode Bahan", "Label QC", "Prefix Bulan"]
+            jumlah = summary_by_kode.groupby(group_keys)[batch_col_primary].transform("nunique")
+
+            # Isi jumlah batch hanya di baris terakhir per grup; baris dengan kunci kosong
+            # (mis. nomor batch tanpa prefix bulan) tidak masuk grup mana pun
+            is_last = ~summary_by_kode.duplicated(group_keys, keep="last") & summary_by_kode[group_keys].notna().all(axis=1)
+            summary_by_kode["Jumlah Batch"] = ""
+            summary_by_kode.loc[is_last, "Jumlah Batch"] = jumlah[is_last].astype(np.int64).astype(str) + " batch"
             
             # Hapus kolom bantu
             summary_by_kode = summary_by_kode.drop(columns=["Prefix Bulan"])
             # Urutkan ulang kolom biar rapi
             summary_by_kode = summary_by_kode[["Kode Bahan", "Label QC", batch_col_primary, "Jumlah Batch"]]
             
-            st.dataframe(summary_by_kode)
+            render_table(summary_by_kode, key="labelqc_per_kode")
             
             excel_summary = to_excel_styled(summary_by_kode)
             st.download_button(
@@ -264,7 +244,7 @@ def filter_labelqc():
                     label_filtered_df = label_filtered_df[column_order]
                     
                     # Tampilkan hasil filter dengan urutan kolom yang sudah diatur
-                    st.dataframe(label_filtered_df)
+                    render_table(label_filtered_df, key="labelqc_per_label")
                     
                     # Opsi untuk pewarnaan Label QC di file Excel
                     warna_excel = st.checkbox("🎨 Warnai kolom Label QC di file Excel")
@@ -295,33 +275,22 @@ def filter_labelqc():
 
 # === KUANTITI ===
 def rapikan(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    batch_indices = df[df["Nomor Batch"].notna()].index.tolist()
-    batch_indices.append(len(df))
-
-    hasil = []
+    batch_mask = df["Nomor Batch"].notna().to_numpy()
 
-    for i in range(len(batch_indices) - 1):
-        start = batch_indices[i]
-        end = batch_indices[i + 1]
-        blok = df.iloc[start:end].reset_index(drop=True)
-
-        n_rows = len(blok)
-        blok_baru = pd.DataFrame(columns=blok.columns)
-
-        for col in blok.columns:
-            if col == "Nomor Batch":
-                isi = [blok.at[0, col]] + ["" for _ in range(n_rows - 1)]
-            else:
-                data_isi = blok[col].dropna().astype(str).str.strip()
-                data_isi = data_isi[data_isi != ""]
-                isi = data_isi.tolist() + [None] * (n_rows - len(data_isi))
+    # Baris sebelum batch pertama tidak termasuk blok mana pun
+    df = df.iloc[int(batch_mask.argmax()) if batch_mask.any() else len(df):].reset_index(drop=True)
 
-            blok_baru[col] = isi
+    # Selain Nomor Batch, nilai dijadikan teks tanpa spasi; teks kosong dianggap kosong
+    df_teks = df.copy()
+    for pos, col in enumerate(df.columns):
+        if col == "Nomor Batch":
+            continue
+        values = df.iloc[:, pos]
+        teks = values.astype(str).str.strip()
+        df_teks.isetitem(pos, teks.where(values.notna() & (teks != "")))
 
-        hasil.append(blok_baru)
-
-    df_bersih = pd.concat(hasil, ignore_index=True)
+    # Geser nilai ke atas di dalam setiap blok batch
+    df_bersih = compact_batch_blocks(df_teks, batch_column="Nomor Batch")
 
     df_bersih = df_bersih.replace(r'^\s*$', np.nan, regex=True)
     df_bersih = df_bersih.replace('', np.nan)
@@ -357,7 +326,7 @@ def kuantiti():
 
     if uploaded_file is not None:
         try:
-            df = pd.read_excel(uploaded_file)
+            df = read_excel_cached(uploaded_file)
 
             # Hapus kolom yang tidak diperlukan
             drop_cols = ["No. Order Produksi", "Jalur"]
@@ -405,54 +374,22 @@ def kuantiti():
             
             st.success("✅ File berhasil dimuat dan dibersihkan.")
             st.subheader("Preview Data Kuantiti")
-            st.dataframe(df_cleaned)
+            render_table(df_cleaned, key="kuantiti_preview")
             # # Tampilkan informasi pembersihan
             # st.info(f"📊 Jumlah baris setelah pembersihan: {len(df_cleaned)}")
 
             # === PERBAIKAN FUNGSI EXPORT EXCEL ===
             def to_excel_download(df):
-                from openpyxl import Workbook
-                from openpyxl.utils.dataframe import dataframe_to_rows
                 from openpyxl.styles import Alignment
                 
-                # Buat copy dataframe dan bersihkan untuk Excel
+                # Semua nilai ditulis sebagai teks; nilai kosong/NaN/None menjadi string kosong
                 df_export = df.copy()
-                
-                # Konversi semua nilai yang bermasalah
-                df_export = df_export.fillna("")  # Ganti NaN dengan string kosong
-                
-                # Konversi semua kolom ke string dan bersihkan
-                for col in df_export.columns:
-                    df_export[col] = df_export[col].astype(str).replace('nan', '').replace('<NA>', '').replace('None', '')
-
-                output = io.BytesIO()
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Data Rapi"
-
-                # Tulis header
-                headers = list(df_export.columns)
-                ws.append(headers)
-                
-                # Tulis data baris per baris
-                for _, row in df_export.iterrows():
-                    row_data = []
-                    for val in row:
-                        # Pastikan tidak ada nilai yang bermasalah
-                        if pd.isna(val) or str(val).strip() in ['nan', '<NA>', 'None']:
-                            row_data.append("")
-                        else:
-                            row_data.append(str(val))
-                    ws.append(row_data)
-
-                # Set alignment
-                for row in ws.iter_rows():
-                    for cell in row:
-                        cell.alignment = Alignment(vertical="center")
-
-                wb.save(output)
-                output.seek(0)
-                return output
+                for pos in range(df_export.shape[1]):
+                    column = df_export.iloc[:, pos]
+                    text = column.astype(object).where(column.notna(), "").astype(str)
+                    df_export.isetitem(pos, text.where(~text.str.strip().isin(['nan', '<NA>', 'None']), ""))
+
+                return to_xlsx_bytes(df_export, sheet_name="Data Rapi", alignment=Alignment(vertical="center"))
 
             # Tombol download Excel hasil rapihan
             st.download_button(
@@ -520,7 +457,7 @@ def kuantiti():
                 filtered_df = filtered_df.fillna("")
                 
                 st.subheader("📋 Data Tersaring (Kelompok Kolom per Bahan)")
-                st.dataframe(filtered_df)
+                render_table(filtered_df, key="kuantiti_tersaring")
             else:
                 st.info("Pilih minimal satu bahan untuk melihat data.")
 
@@ -1,30 +1,66 @@
 from openpyxl import load_workbook
 
-def extract_multi_level_headers(excel_file, start_row=4, num_levels=3):
-    wb = load_workbook(excel_file, data_only=True)
-    ws = wb.active
 
-    headers = []
-    max_col = ws.max_column
+def build_merged_anchor_map(ws, min_row=None, max_row=None):
+    """
+    Membangun lookup (baris, kolom) -> (baris, kolom) sel anchor untuk semua merged cell.
+    Cukup dibangun sekali per sheet, bisa dibatasi ke rentang baris header saja.
+    """
+    anchors = {}
+    for merged_range in ws.merged_cells.ranges:
+        first_row = merged_range.min_row if min_row is None else max(merged_range.min_row, min_row)
+        last_row = merged_range.max_row if max_row is None else min(merged_range.max_row, max_row)
+        anchor = (merged_range.min_row, merged_range.min_col)
+
+        for row in range(first_row, last_row + 1):
+            for col in range(merged_range.min_col, merged_range.max_col + 1):
+                # Range pertama yang memuat sel yang dipakai (sama seperti pencarian linear sebelumnya)
+                anchors.setdefault((row, col), anchor)
+
+    return anchors
+
+
+def read_header_levels(ws, start_row, num_levels, max_col=None):
+    """
+    Membaca nilai header bertingkat per kolom, merged cell diarahkan ke sel anchor-nya.
+    Mengembalikan list level (string) untuk setiap kolom.
+    """
+    end_row = start_row + num_levels - 1
+    max_col = max_col or ws.max_column
+    anchors = build_merged_anchor_map(ws, min_row=start_row, max_row=end_row)
 
+    levels_per_col = []
     for col in range(1, max_col + 1):
         levels = []
-        for row in range(start_row, start_row + num_levels):
-            cell = ws.cell(row=row, column=col)
+        for row in range(start_row, end_row + 1):
+            anchor_row, anchor_col = anchors.get((row, col), (row, col))
+            value = ws.cell(row=anchor_row, column=anchor_col).value
+            levels.append(str(value).strip() if value else "")
+        levels_per_col.append(levels)
 
-            # Tangani merge cell
-            for merged_range in ws.merged_cells.ranges:
-                if cell.coordinate in merged_range:
-                    cell = ws.cell(row=merged_range.min_row, column=merged_range.min_col)
-                    break
+    return levels_per_col
 
-            value = str(cell.value).strip() if cell.value else ""
-            levels.append(value)
 
-        # Untuk kolom 1-3, ambil hanya level pertama
+def combine_header_levels(levels_per_col, keep_empty_levels=False):
+    """
+    Menggabungkan level header menjadi satu nama kolom dengan pemisah " > ".
+    Kolom 1-3 hanya mengambil level pertama.
+    """
+    headers = []
+    for col, levels in enumerate(levels_per_col, start=1):
         if col <= 3:
             headers.append(levels[0])
+        elif keep_empty_levels:
+            headers.append(" > ".join(levels))
         else:
             headers.append(" > ".join([h for h in levels if h]))
 
     return headers
+
+
+def extract_multi_level_headers(excel_file, start_row=4, num_levels=3, keep_empty_levels=False):
+    wb = load_workbook(excel_file, data_only=True)
+    ws = wb.active
+
+    levels_per_col = read_header_levels(ws, start_row, num_levels)
+    return combine_header_levels(levels_per_col, keep_empty_levels=keep_empty_levels)
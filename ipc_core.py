@@ -0,0 +1,297 @@
+import numpy as np
+import pandas as pd
+
+from ipc_stats import BASIC_STATS, compute_statistics, describe_batches
+from parse_cache import read_excel_cached
+from utils import clean_numeric_series, float_values
+
+# Parser IPC tanpa Streamlit. Setiap parser mengembalikan (hasil, messages);
+# messages berisi tuple (level, teks) dengan level "error", "warning", atau "info"
+# untuk ditampilkan oleh halaman Streamlit atau dicatat oleh CLI.
+
+
+# --- Fungsi Helper ---
+def calculate_statistics(df, extras=(), lsl=None, usl=None):
+    """
+    Menghitung statistik (MIN, MAX, MEAN, SD, RSD) untuk setiap batch dalam dataframe.
+    Statistik tambahan (MEDIAN, N, Cp, Cpk) bisa diminta lewat extras, lihat ipc_stats.
+    """
+    return describe_batches(df, extras=extras, lsl=lsl, usl=usl)
+
+
+def _stack_batch_readings(df_data, data_cols_indices, values_per_col, target_length):
+    """
+    Menyusun data per batch (kolom pertama = nomor batch) dengan satu groupby/cumcount:
+    untuk setiap batch diambil values_per_col baris pertama dari setiap kolom data,
+    ditumpuk per kolom (kolom E dulu, lalu F, dst), dibersihkan sekaligus, lalu
+    nilai valid digeser ke atas dan dipotong/diisi NaN sampai target_length.
+
+    Returns:
+        tuple (nama batch, array (batch x target_length), jumlah nilai valid per batch,
+        ada kolom data atau tidak). Urutan batch sesuai kemunculan pertama.
+    """
+    batch_column = df_data.iloc[:, 0]
+    has_batch = batch_column.notna().to_numpy()
+    codes, batches = pd.factorize(batch_column[has_batch])
+    batch_names = [str(batch) for batch in batches]
+
+    available_cols = [col_idx for col_idx in data_cols_indices if col_idx < df_data.shape[1]]
+    if not available_cols:
+        return batch_names, np.empty((len(batches), 0)), np.zeros(len(batches), dtype=int), False
+
+    # Posisi baris di dalam batch masing-masing; hanya values_per_col baris pertama yang dipakai
+    rank = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    used = rank < values_per_col
+    codes, rank = codes[used], rank[used]
+
+    raw = np.full((len(batches), len(available_cols), values_per_col), np.nan, dtype=object)
+    for j, col_idx in enumerate(available_cols):
+        raw[codes, j, rank] = df_data.iloc[:, col_idx].to_numpy(dtype=object)[has_batch][used]
+
+    readings = clean_numeric_series(pd.Series(raw.ravel(), dtype=object)).to_numpy()
+    readings = readings.reshape(len(batches), len(available_cols) * values_per_col)
+
+    present = ~np.isnan(readings)
+    readings = np.take_along_axis(readings, np.argsort(~present, axis=1, kind='stable'), axis=1)
+    if readings.shape[1] < target_length:
+        padding = np.full((len(batches), target_length - readings.shape[1]), np.nan)
+        readings = np.concatenate([readings, padding], axis=1)
+    return batch_names, readings[:, :target_length], present.sum(axis=1), True
+
+# --- Parser untuk Setiap Jenis Pengujian ---
+
+def parse_kekerasan(file):
+    """
+    Mengembalikan (final_df, messages). final_df berisi data per batch + statistik,
+    atau None jika file tidak sesuai template / tidak ada data valid.
+    """
+    messages = []
+    df = read_excel_cached(file, header=None)
+    if df.shape[0] < 10 or df.shape[1] < 6:
+        messages.append(("error", "Template tidak sesuai (Kekerasan)."))
+        return None, messages
+
+    # Layout tetap: setiap batch 8 baris mulai baris 3, nama batch di kolom A,
+    # data 1-5 di kolom E dan data 6-10 di kolom F. Semua blok dibaca sekaligus
+    starts = np.arange(2, df.shape[0] - 7, 8)
+    batch_names = df.iloc[starts, 0]
+    blank = (batch_names.isna() | (batch_names.astype(object).astype(str).str.strip() == '')).to_numpy()
+    if blank.any():
+        # Blok dengan nama batch kosong menandai akhir data
+        starts = starts[:np.argmax(blank)]
+        batch_names = batch_names.iloc[:len(starts)]
+
+    rows = starts[:, None] + np.arange(5)
+    raw = np.concatenate([df.iloc[:, 4].to_numpy(dtype=object)[rows], df.iloc[:, 5].to_numpy(dtype=object)[rows]], axis=1)
+    readings = pd.to_numeric(pd.Series(raw.ravel(), dtype=object), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    readings = readings.reshape(len(starts), 10)
+
+    # Nilai valid digeser ke atas (urutan tetap), sisanya NaN; batch butuh minimal 8 data
+    present = ~np.isnan(readings)
+    readings = np.take_along_axis(readings, np.argsort(~present, axis=1, kind='stable'), axis=1)
+    complete = present.sum(axis=1) >= 8
+
+    batch_data = {}
+    for batch_name, values, is_complete in zip(batch_names.astype(object).astype(str).tolist(), readings, complete):
+        if is_complete:
+            batch_data[batch_name] = values
+        else:
+            messages.append(("warning", f"Batch {batch_name} tidak lengkap. Diabaikan."))
+    result_df = pd.DataFrame(batch_data, index=range(1, 11)) # Kekerasan biasanya 10 data
+
+    if result_df.empty:
+        messages.append(("error", "Tidak ada data valid (Kekerasan)."))
+        return None, messages
+    stats_df = calculate_statistics(result_df)
+    final_df = pd.concat([result_df, stats_df])
+    return final_df, messages
+
+def parse_keseragaman_bobot(file):
+    """
+    Mengembalikan ((result_df, stats_df), messages), atau (None, messages) jika tidak ada data valid.
+    """
+    messages = []
+    df = read_excel_cached(file, header=None)
+    if df.empty:
+        messages.append(("error", "File Keseragaman Bobot kosong."))
+        return None, messages
+
+    header_row_index = 0
+    header_row = df.iloc[header_row_index]
+    df_data = df[header_row_index+1:].copy()
+    df_data.columns = header_row
+    df_data.reset_index(drop=True, inplace=True)
+    df_data = df_data[~df_data.iloc[:, 0].astype(str).str.contains("Rata|SD|RSD", na=False, case=False)]
+    batch_names, readings, counts, has_columns = _stack_batch_readings(
+        df_data, data_cols_indices=[4, 5, 6, 7], values_per_col=5, target_length=20
+    )
+    batch_data = {}
+    for batch, values, count in zip(batch_names, readings, counts):
+        if not has_columns:
+            messages.append(("warning", f"Kolom data E,F,G,H tidak ditemukan batch {batch}."))
+        elif count == 0:
+            messages.append(("warning", f"Tidak ada data numerik valid batch {batch}."))
+        else:
+            batch_data[batch] = values
+    result_df = pd.DataFrame(batch_data, index=range(1, 21))
+    if result_df.empty:
+        messages.append(("error", "Tidak ada data Keseragaman Bobot valid."))
+        return None, messages
+    stats_df = calculate_statistics(result_df)
+    return (result_df, stats_df), messages
+
+def parse_keseragaman_bobot_effervescent(file):
+    """
+    Mengembalikan (result_df, messages). result_df berisi data per batch (transpose).
+    """
+    messages = []
+    df = read_excel_cached(file, header=None)
+    if df.empty:
+        messages.append(("error", "File Keseragaman Bobot Effervescent kosong."))
+        return None, messages
+
+    df_needed = df.iloc[:, [0] + list(range(4, df.shape[1]))].copy()
+    df_needed.columns = ['Nomor Batch'] + [f'Data{i}' for i in range(1, df_needed.shape[1])]
+    grouped = df_needed.groupby('Nomor Batch')
+
+    # Nomor grup per baris (urut sesuai groupby); baris tanpa nomor batch tidak ikut
+    group_ids = grouped.ngroup().to_numpy()
+    has_batch = ~np.isnan(group_ids)
+    group_ids = np.where(has_batch, group_ids, -1).astype(np.int64)
+    first_rows = np.unique(group_ids[has_batch], return_index=True)[1]
+    batch_names = df_needed['Nomor Batch'].to_numpy(dtype=object)[has_batch][first_rows]
+
+    # Semua nilai yang terisi, dibaca per baris (kiri ke kanan), lalu dikelompokkan per batch
+    # dengan urutan baris tetap
+    data = df_needed.iloc[:, 1:]
+    row_idx, col_idx = np.nonzero(data.notna().to_numpy(dtype=bool) & has_batch[:, None])
+    value_groups = group_ids[row_idx]
+    order = np.argsort(value_groups, kind='stable')
+    data_values = data.to_numpy(dtype=object)[row_idx, col_idx][order]
+    counts = np.bincount(value_groups, minlength=len(batch_names))
+
+    batch_dict = dict(zip(batch_names, (list(values) for values in np.split(data_values, np.cumsum(counts)[:-1]))))
+
+    max_length = max(len(v) for v in batch_dict.values())
+    result_data = {"Data Ke-": list(range(1, max_length + 1))}
+    for batch, values in batch_dict.items():
+        result_data[batch] = values + [np.nan] * (max_length - len(values))
+    result_df = pd.DataFrame(result_data)
+
+    if "Nomor Batch" in result_df.columns:
+        result_df = result_df.drop(columns=["Nomor Batch"])
+
+    return result_df, messages
+
+def parse_tebal(file):
+    """
+    Mengembalikan (exportable_df, messages). exportable_df berisi data per batch + statistik,
+    atau None jika tidak ada data valid.
+    """
+    messages = []
+    df = read_excel_cached(file, header=None)
+    if df.empty:
+        messages.append(("error", "File Tebal kosong."))
+        return None, messages
+
+    header_row_index = 0
+    header_row = df.iloc[header_row_index]
+    df_data = df[header_row_index+1:].copy()
+    df_data.columns = header_row
+    df_data.reset_index(drop=True, inplace=True)
+    batch_names, readings, counts, has_columns = _stack_batch_readings(
+        df_data, data_cols_indices=[4, 5], values_per_col=3, target_length=6
+    )
+    batch_data = {}
+    for batch, values, count in zip(batch_names, readings, counts):
+        if not has_columns:
+            messages.append(("warning", f"Kolom data E,F tidak ditemukan batch {batch}."))
+        elif count == 0:
+            messages.append(("warning", f"Tidak ada data numerik valid batch tebal {batch}."))
+        else:
+            batch_data[batch] = values
+    result_df = pd.DataFrame(batch_data, index=range(1, 7))
+    if result_df.empty:
+        messages.append(("error", "Tidak ada data Tebal valid."))
+        return None, messages
+    stats_df = calculate_statistics(result_df)
+    exportable_df = pd.concat([result_df, stats_df])
+    return exportable_df, messages
+
+def _summary_statistics(values):
+    # Statistik ringkas (Minimum, Maximum, Rata-rata, SD, RSD) untuk Waktu Hancur/Friability.
+    # skipna=False: nilai NaN (mis. dari sel teks "nan") membuat statistiknya NaN seperti sebelumnya
+    stats = compute_statistics(np.array(values, dtype=np.float64).reshape(1, -1), skipna=False)
+    return [stats[name][0] for name in BASIC_STATS]
+
+def parse_waktu_hancur_friability(file):
+    """
+    Mengembalikan ((waktu_hancur_df, friability_df), messages).
+    DataFrame yang tidak memiliki data dikembalikan kosong.
+    """
+    messages = []
+    df = read_excel_cached(file, header=None)
+    if df.empty:
+        messages.append(("error", "File Waktu Hancur/Friability kosong."))
+        return (pd.DataFrame(), pd.DataFrame()), messages
+
+    header_row_idx = None; batch_col_idx = None; value_col_idx = None
+    for i in range(min(10, len(df))):
+        row_values = df.iloc[i].astype(str)
+        if "Nomor Batch" in row_values.values:
+            header_row_idx = i
+            batch_col_idx = row_values[row_values.str.contains("Nomor Batch", case=False, na=False)].index[0]
+            if "Sample Data" in row_values.values: value_col_idx = row_values[row_values.str.contains("Sample Data", case=False, na=False)].index[0]
+            break
+    if header_row_idx is None:
+        messages.append(("warning", "Header 'Nomor Batch' tidak ditemukan..."))
+        header_row_idx = 0; batch_col_idx = 0
+    if value_col_idx is None:
+        potential_value_col = 4
+        if df.shape[1] > potential_value_col:
+            messages.append(("warning", "Kolom 'Sample Data' tidak ditemukan..."))
+            value_col_idx = potential_value_col
+        else:
+            messages.append(("error", "Tidak dapat menemukan kolom data."))
+            return (pd.DataFrame(), pd.DataFrame()), messages
+    df.columns = df.iloc[header_row_idx]; data_df = df.iloc[header_row_idx+1:].copy()
+    batch_col_name = data_df.columns[batch_col_idx]
+    data_df = data_df[~data_df[batch_col_name].isna()]
+    # Nilai per baris diambil dari array gabungan (sama seperti baris iterrows)
+    row_values = data_df.to_numpy()
+    batches = pd.Series([str(batch) for batch in row_values[:, batch_col_idx]], dtype=object)
+    raw_values = pd.Series(row_values[:, value_col_idx], dtype=object)
+    filled = raw_values.notna().to_numpy()
+    batches, raw_values = batches[filled].reset_index(drop=True), raw_values[filled].reset_index(drop=True)
+
+    values, valid = float_values(raw_values)
+    for batch, value_raw in zip(batches[~valid], raw_values[~valid]):
+        messages.append(("warning", f"Melewatkan baris batch {batch}, nilai tidak valid: {value_raw}"))
+
+    # Friability: 0 <= nilai < 2.5, sisanya Waktu Hancur. Per batch hanya nilai pertama yang ditampilkan
+    with np.errstate(invalid='ignore'):
+        is_friability = valid & (values >= 0) & (values < 2.5)
+    is_waktu_hancur = valid & ~is_friability
+    friability_values = values[is_friability]
+    waktu_hancur_values = values[is_waktu_hancur]
+    friability_batches = batches[is_friability]
+    waktu_hancur_batches = batches[is_waktu_hancur]
+    first_fr = ~friability_batches.duplicated().to_numpy()
+    first_wh = ~waktu_hancur_batches.duplicated().to_numpy()
+    friability_data_dict = dict(zip(friability_batches[first_fr], friability_values[first_fr]))
+    waktu_hancur_data_dict = dict(zip(waktu_hancur_batches[first_wh], waktu_hancur_values[first_wh]))
+    all_friability_values = friability_values.tolist()
+    all_waktu_hancur_values = waktu_hancur_values.tolist()
+    stat_labels = ["Minimum", "Maximum", "Rata-rata", "Standar Deviasi", "RSD (%)"]
+    waktu_hancur_df = pd.DataFrame()
+    if waktu_hancur_data_dict:
+        batch_df_wh = pd.DataFrame(list(waktu_hancur_data_dict.items()), columns=["Batch", "Waktu Hancur"]).sort_values("Batch").reset_index(drop=True)
+        stats_df_wh = pd.DataFrame({"Batch": stat_labels, "Waktu Hancur": _summary_statistics(all_waktu_hancur_values)})
+        waktu_hancur_df = pd.concat([batch_df_wh, stats_df_wh], ignore_index=True)
+    friability_df = pd.DataFrame()
+    if friability_data_dict:
+        batch_df_fr = pd.DataFrame(list(friability_data_dict.items()), columns=["Batch", "Friability"]).sort_values("Batch").reset_index(drop=True)
+        stats_df_fr = pd.DataFrame({"Batch": stat_labels, "Friability": _summary_statistics(all_friability_values)})
+        friability_df = pd.concat([batch_df_fr, stats_df_fr], ignore_index=True)
+
+    return (waktu_hancur_df, friability_df), messages
@@ -2,53 +2,22 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import io
-import re
 
-# --- Fungsi Helper ---
-def _clean_numeric_value_helper(val):
-    """
-    Membersihkan dan mengkonversi nilai menjadi float.
-    Menangani string angka yang mungkin tergabung atau mengandung karakter non-numerik.
-    """
-    if isinstance(val, str):
-        if len(val) > 7 and '.' in val and val.count('.') > 1 and ' ' not in val:
-            numbers = re.findall(r'-?\d+\.?\d*', val) 
-            if numbers:
-                try:
-                    return float(numbers[0]) 
-                except ValueError:
-                    pass 
-        try:
-            return float(val)
-        except ValueError:
-            return np.nan
-    elif isinstance(val, (int, float)):
-        return float(val)
-    return np.nan
-
-def calculate_statistics(df):
-    """
-    Menghitung statistik (MIN, MAX, MEAN, SD, RSD) untuk setiap batch dalam dataframe.
-    """
-    stats_df = pd.DataFrame()
-    for column in df.columns:
-        numeric_data = pd.to_numeric(df[column], errors='coerce').dropna()
-        if numeric_data.empty:
-            min_val, max_val, mean_val, std_val, rsd_val = np.nan, np.nan, np.nan, np.nan, np.nan
-        else:
-            min_val = numeric_data.min()
-            max_val = numeric_data.max()
-            mean_val = numeric_data.mean()
-            std_val = numeric_data.std(ddof=1) 
-            rsd_val = (std_val / mean_val * 100) if mean_val != 0 else np.nan
-        
-        stats_df[column] = [min_val, max_val, mean_val, std_val, rsd_val]
-    stats_df.index = ['MIN', 'MAX', 'MEAN', 'SD', 'RSD (%)']
-    return stats_df
+from ipc_core import (
+    parse_kekerasan,
+    parse_keseragaman_bobot,
+    parse_keseragaman_bobot_effervescent,
+    parse_tebal,
+    parse_waktu_hancur_friability,
+)
+from excel_export import to_xlsx_bytes
+from ipc_stats import BASIC_STATS, EXTRA_STATS
+from table_view import render_table
+from ui_utils import render_messages, upload_key
 
 # --- Helper untuk Styling Tabel ---
 # Daftar label yang mengindikasikan baris statistik
-STAT_ROW_LABELS = ['MIN', 'MAX', 'MEAN', 'SD', 'RSD (%)', # Dari calculate_statistics
+STAT_ROW_LABELS = BASIC_STATS + EXTRA_STATS + [ # Dari calculate_statistics
                    'Minimum', 'Maximum', 'Rata-rata', 'Standar Deviasi'] # Dari Waktu Hancur/Friability
 
 def data_cell_formatter(val):
@@ -69,10 +38,63 @@ def stat_cell_formatter(val, decimals=4):
         return f"{val:.{decimals}f}"
     return str(val)
 
-def set_common_table_properties(styler_obj):
-    """Menerapkan properti tampilan umum ke Styler."""
-    styler_obj.set_properties(**{'text-align': 'left'}) \
-              .set_table_styles([dict(selector='th', props=[('text-align', 'left')])])
+def format_data_values(values):
+    """
+    Versi vektor dari data_cell_formatter untuk array float (dimensi berapa pun), hasilnya array teks.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, "", dtype=object)
+    finite = np.isfinite(values)
+    whole = finite & (values == np.floor(np.where(finite, values, 0)))
+    # Bilangan bulat tanpa ".0"; nilai di luar jangkauan int64 dikonversi lewat int Python
+    small = whole & (np.abs(values) < 2.0 ** 63)
+    result[small] = values[small].astype(np.int64).astype(str)
+    result[whole & ~small] = [str(int(val)) for val in values[whole & ~small].tolist()]
+    # Pecahan dan inf: teks numpy sama dengan str(float)
+    other = ~np.isnan(values) & ~whole
+    result[other] = values[other].astype(str)
+    return result
+
+def format_stat_values(values, decimals=4):
+    """Versi vektor dari stat_cell_formatter untuk array float (dimensi berapa pun), hasilnya array teks."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, "", dtype=object)
+    present = ~np.isnan(values)
+    result[present] = np.char.mod(f"%.{decimals}f", values[present])
+    return result
+
+def build_display_frame(df_to_format, stat_rows_mask, numeric_cols_to_format, stat_decimals=4):
+    """
+    Membuat DataFrame berisi teks tampilan (pengganti Pandas Styler). Di kolom numeric_cols_to_format,
+    baris data ditampilkan apa adanya dan baris statistik (stat_rows_mask) dengan stat_decimals desimal;
+    kolom lain ditampilkan sebagai teks. Semua kolom float diformat bersama sebagai satu array 2-D.
+    """
+    stat_rows_mask = np.asarray(stat_rows_mask, dtype=bool)
+    data_rows_mask = ~stat_rows_mask
+    numeric_positions = set(df_to_format.columns.get_indexer_for(numeric_cols_to_format))
+    dtypes = df_to_format.dtypes.tolist()
+    float_positions = [pos for pos in sorted(numeric_positions) if pos >= 0 and pd.api.types.is_float_dtype(dtypes[pos])]
+
+    texts = np.full(df_to_format.shape, "", dtype=object)
+    if float_positions:
+        values = df_to_format.iloc[:, float_positions].to_numpy(dtype=np.float64, na_value=np.nan)
+        block = np.full(values.shape, "", dtype=object)
+        block[data_rows_mask] = format_data_values(values[data_rows_mask])
+        block[stat_rows_mask] = format_stat_values(values[stat_rows_mask], decimals=stat_decimals)
+        texts[:, float_positions] = block
+
+    for pos in sorted(set(range(df_to_format.shape[1])) - set(float_positions)):
+        column = df_to_format.iloc[:, pos].tolist()
+        if pos in numeric_positions:
+            # Kolom bukan float (teks/campuran) diformat per sel
+            texts[:, pos] = [
+                stat_cell_formatter(val, decimals=stat_decimals) if is_stat else data_cell_formatter(val)
+                for val, is_stat in zip(column, stat_rows_mask)
+            ]
+        else:
+            texts[:, pos] = ["" if pd.isna(val) else str(val) for val in column]
+
+    return pd.DataFrame(texts, index=df_to_format.index, columns=df_to_format.columns, dtype=object)
 
 def apply_conditional_formatting(df_to_format, id_source_type, # 'index' atau nama kolom
                                  numeric_cols_to_format,
@@ -80,30 +102,21 @@ def apply_conditional_formatting(df_to_format, id_source_type, # 'index' atau na
                                  parser_origin_name # Nama fungsi parser asal untuk lookup desimal
                                  ):
     """
-    Membuat dan mengembalikan objek Pandas Styler dengan format kondisional.
+    Membuat DataFrame teks tampilan dengan format kondisional (baris statistik dikenali dari STAT_ROW_LABELS).
     """
-    styler = df_to_format.style
-    
     current_stat_decimals = stat_decimals_map.get(parser_origin_name, 4) # Default 4 jika tidak dispesifikkan
 
     if id_source_type == 'index':
         source_for_mask = df_to_format.index.map(str) # Bandingkan string dengan string
     else: # id_source_type adalah nama kolom
-        source_for_mask = df_to_format[id_source_type].astype(str)
-        styler.format({id_source_type: "{}"}, na_rep="") # Format kolom ID sebagai string
-
-    data_rows_mask = ~source_for_mask.isin(STAT_ROW_LABELS)
+        source_for_mask = df_to_format[id_source_type].map(str)
     stat_rows_mask = source_for_mask.isin(STAT_ROW_LABELS)
 
-    # Buat fungsi formatter statistik dengan jumlah desimal yang tepat
-    current_stat_formatter = lambda x: stat_cell_formatter(x, decimals=current_stat_decimals)
+    return build_display_frame(df_to_format, stat_rows_mask, numeric_cols_to_format, stat_decimals=current_stat_decimals)
 
-    # Terapkan formatter ke subset yang sesuai
-    styler.format(data_cell_formatter, subset=pd.IndexSlice[data_rows_mask, numeric_cols_to_format], na_rep="")
-    styler.format(current_stat_formatter, subset=pd.IndexSlice[stat_rows_mask, numeric_cols_to_format], na_rep="")
-    
-    set_common_table_properties(styler) # Terapkan properti umum tabel
-    return styler
+def _table_key(data_key, table_name):
+    # data_key tabel tampilan: identitas upload + nama tabel (None -> render_table meng-hash isi tabel)
+    return None if data_key is None else (data_key, table_name)
 
 # Definisikan jumlah desimal untuk statistik per jenis pengujian
 STAT_DECIMALS_PER_TEST = {
@@ -115,104 +128,52 @@ STAT_DECIMALS_PER_TEST = {
 }
 
 # --- Fungsi Parsing untuk Setiap Jenis Pengujian (dengan styling terpusat) ---
+# Parsing dilakukan di ipc_core; fungsi di sini hanya menampilkan pesan dan tabel hasilnya.
 
-def parse_kekerasan_excel(file):
+def parse_kekerasan_excel(file, data_key=None):
     try:
-        df = pd.read_excel(file, header=None) 
-        if df.shape[0] < 10 or df.shape[1] < 6:
-            st.error("Template tidak sesuai (Kekerasan).")
-            return None
-        # ... (logika parsing Kekerasan tetap sama hingga final_df) ...
-        result_df = pd.DataFrame()
-        current_row = 2
-        while current_row < df.shape[0] - 7: 
-            try:
-                batch_name_val = df.iloc[current_row, 0] 
-                if pd.isna(batch_name_val) or str(batch_name_val).strip() == '': break 
-                batch_name = str(batch_name_val)
-                data_1_5 = df.iloc[current_row:current_row+5, 4] if df.shape[1] > 4 else pd.Series(dtype='float64')
-                data_6_10 = df.iloc[current_row:current_row+5, 5] if df.shape[1] > 5 else pd.Series(dtype='float64')
-                values = pd.concat([data_1_5, data_6_10], ignore_index=True)
-                values = pd.to_numeric(values, errors='coerce').dropna()
-                if len(values) >= 8: 
-                    values = values[:10] 
-                    if len(values) < 10:
-                        values = pd.concat([values, pd.Series([np.nan] * (10 - len(values)))], ignore_index=True)
-                    result_df[batch_name] = values
-                else: st.warning(f"Batch {batch_name} tidak lengkap. Diabaikan.")
-                current_row += 8 
-            except IndexError: st.warning(f"Error struktur data baris ~{current_row}."); current_row += 8; continue
-            except Exception as e: st.warning(f"Error batch baris {current_row}: {e}"); current_row += 8; continue
-        if result_df.empty: st.error("Tidak ada data valid (Kekerasan)."); return None
-        result_df.index = range(1, 11) # Kekerasan biasanya 10 data
-        stats_df = calculate_statistics(result_df)
-        final_df = pd.concat([result_df, stats_df])
-        
+        final_df, messages = parse_kekerasan(file)
+        render_messages(messages)
+        if final_df is None: return None
+
         st.write("Data Kekerasan dengan Statistik:")
         numeric_cols = final_df.columns.tolist()
-        styled_df = apply_conditional_formatting(
+        formatted_df = apply_conditional_formatting(
             df_to_format=final_df,
             id_source_type='index', # Gunakan index (1,2,..,'MIN','MAX') untuk bedakan baris
             numeric_cols_to_format=numeric_cols,
             stat_decimals_map=STAT_DECIMALS_PER_TEST,
             parser_origin_name="Kekerasan"
         )
-        st.dataframe(styled_df)
+        render_table(formatted_df, key="ipc_kekerasan", data_key=_table_key(data_key, "kekerasan"), sortable=False)
         return final_df
     except Exception as e:
         st.error(f"Gagal memproses file Kekerasan: {e}")
         st.exception(e)
         return None
 
-def parse_keseragaman_bobot_excel(file):
+def parse_keseragaman_bobot_excel(file, data_key=None):
     try:
-        df = pd.read_excel(file, header=None)
-        if df.empty: st.error("File Keseragaman Bobot kosong."); return None
-        # ... (logika parsing Keseragaman Bobot tetap sama hingga result_df dan stats_df) ...
-        header_row_index = 0 
-        header_row = df.iloc[header_row_index]
-        df_data = df[header_row_index+1:].copy()
-        df_data.columns = header_row
-        df_data.reset_index(drop=True, inplace=True)
-        batch_column_name = df_data.columns[0]
-        df_data = df_data[~df_data.iloc[:, 0].astype(str).str.contains("Rata|SD|RSD", na=False, case=False)]
-        batch_series = df_data[batch_column_name].dropna().unique()
-        result_df = pd.DataFrame()
-        data_cols_indices = [4, 5, 6, 7]
-        for batch_val in batch_series:
-            batch = str(batch_val)
-            subset = df_data[df_data[batch_column_name] == batch_val]
-            if subset.empty: continue
-            all_batch_values = []
-            for col_idx in data_cols_indices:
-                if col_idx < subset.shape[1]: 
-                    all_batch_values.append(subset.iloc[0:5, col_idx])
-            if not all_batch_values: st.warning(f"Kolom data E,F,G,H tidak ditemukan batch {batch}."); continue
-            stacked_values = pd.concat(all_batch_values, ignore_index=True)
-            cleaned_values = stacked_values.apply(_clean_numeric_value_helper).dropna() 
-            if not cleaned_values.empty:
-                target_length = 20
-                if len(cleaned_values) < target_length:
-                    padding = pd.Series([np.nan] * (target_length - len(cleaned_values)))
-                    cleaned_values = pd.concat([cleaned_values, padding], ignore_index=True)
-                result_df[batch] = cleaned_values[:target_length]
-            else: st.warning(f"Tidak ada data numerik valid batch {batch}.")
-        if result_df.empty: st.error("Tidak ada data Keseragaman Bobot valid."); return None
-        result_df.index = range(1, len(result_df) + 1)
+        result, messages = parse_keseragaman_bobot(file)
+        render_messages(messages)
+        if result is None: return None
+        result_df, stats_df = result
 
         st.write("Data Keseragaman Bobot Terstruktur:")
-        # Untuk result_df (data asli), semua sel diformat dengan data_cell_formatter
-        styled_result_df = result_df.style.format(data_cell_formatter, na_rep="")
-        set_common_table_properties(styled_result_df)
-        st.dataframe(styled_result_df)
+        # Untuk result_df (data asli), semua sel diformat seperti data_cell_formatter
+        no_stat_rows = np.zeros(len(result_df), dtype=bool)
+        render_table(
+            build_display_frame(result_df, no_stat_rows, result_df.columns),
+            key="ipc_kb_data", data_key=_table_key(data_key, "kb_data"), sortable=False,
+        )
         
-        stats_df = calculate_statistics(result_df)
         st.write("Statistik Data Keseragaman Bobot:")
-        # Untuk stats_df, semua sel diformat dengan stat_cell_formatter
-        stat_formatter_for_kb = lambda x: stat_cell_formatter(x, decimals=STAT_DECIMALS_PER_TEST["Keseragaman Bobot"])
-        styled_stats_df = stats_df.style.format(stat_formatter_for_kb, na_rep="")
-        set_common_table_properties(styled_stats_df)
-        st.dataframe(styled_stats_df)
+        # Untuk stats_df, semua sel diformat seperti stat_cell_formatter
+        all_stat_rows = np.ones(len(stats_df), dtype=bool)
+        formatted_stats_df = build_display_frame(
+            stats_df, all_stat_rows, stats_df.columns, stat_decimals=STAT_DECIMALS_PER_TEST["Keseragaman Bobot"]
+        )
+        render_table(formatted_stats_df, key="ipc_kb_stat", data_key=_table_key(data_key, "kb_stat"), sortable=False)
         
         export_df = pd.concat([result_df, stats_df])
         return export_df
@@ -221,44 +182,19 @@ def parse_keseragaman_bobot_excel(file):
         st.exception(e)
         return None
 
-def parse_keseragaman_bobot_effervescent_excel(file):
+def parse_keseragaman_bobot_effervescent_excel(file, data_key=None):
     try:
-        df = pd.read_excel(file, header=None)
-        if df.empty:
-            st.error("File Keseragaman Bobot Effervescent kosong.")
+        result_df, messages = parse_keseragaman_bobot_effervescent(file)
+        render_messages(messages)
+        if result_df is None:
             return None
 
-        df_needed = df.iloc[:, [0] + list(range(4, df.shape[1]))].copy()
-        df_needed.columns = ['Nomor Batch'] + [f'Data{i}' for i in range(1, df_needed.shape[1])]
-        grouped = df_needed.groupby('Nomor Batch')
-
-        batch_dict = {}
-        for batch_name, group in grouped:
-            data_values = []
-
-            for _, row in group.iterrows():
-                row_values = row.iloc[1:].tolist()
-                cleaned_values = [v for v in row_values if pd.notna(v)]
-                data_values.extend(cleaned_values)
-
-            batch_dict[batch_name] = data_values
-
-        max_length = max(len(v) for v in batch_dict.values())
-        result_df = pd.DataFrame()
-        result_df["Data Ke-"] = list(range(1, max_length + 1))
-        
-        for batch, values in batch_dict.items():
-            if len(values) < max_length:
-                values.extend([np.nan] * (max_length - len(values)))
-            result_df[batch] = values
-
-        if "Nomor Batch" in result_df.columns:
-            result_df = result_df.drop(columns=["Nomor Batch"])
-        
         st.write("Data Keseragaman Bobot Effervescent Transpose:")
-        styled_df = result_df.style.format(data_cell_formatter, na_rep="")
-        set_common_table_properties(styled_df)
-        st.dataframe(styled_df)
+        no_stat_rows = np.zeros(len(result_df), dtype=bool)
+        render_table(
+            build_display_frame(result_df, no_stat_rows, result_df.columns),
+            key="ipc_kb_effervescent", data_key=_table_key(data_key, "kb_effervescent"), sortable=False,
+        )
 
         return result_df
 
@@ -268,43 +204,11 @@ def parse_keseragaman_bobot_effervescent_excel(file):
         return None
 
 
-def parse_tebal_excel(file):
+def parse_tebal_excel(file, data_key=None):
     try:
-        df = pd.read_excel(file, header=None)
-        if df.empty: st.error("File Tebal kosong."); return None
-        # ... (logika parsing Tebal tetap sama hingga exportable_df) ...
-        header_row_index = 0
-        header_row = df.iloc[header_row_index]
-        df_data = df[header_row_index+1:].copy()
-        df_data.columns = header_row
-        df_data.reset_index(drop=True, inplace=True)
-        batch_column_name = df_data.columns[0] 
-        batch_series = df_data[batch_column_name].dropna().unique()
-        result_df = pd.DataFrame()
-        data_cols_indices = [4, 5] 
-        num_values_per_col = 3
-        for batch_val in batch_series:
-            batch = str(batch_val)
-            subset = df_data[df_data[batch_column_name] == batch_val]
-            if subset.empty: continue
-            all_batch_values = []
-            for col_idx in data_cols_indices:
-                if col_idx < subset.shape[1]: 
-                    all_batch_values.append(subset.iloc[0:num_values_per_col, col_idx])
-            if not all_batch_values: st.warning(f"Kolom data E,F tidak ditemukan batch {batch}."); continue
-            stacked_values = pd.concat(all_batch_values, ignore_index=True)
-            cleaned_values = stacked_values.apply(_clean_numeric_value_helper).dropna()
-            if not cleaned_values.empty:
-                target_length = 6 
-                if len(cleaned_values) < target_length:
-                    padding = pd.Series([np.nan] * (target_length - len(cleaned_values)))
-                    cleaned_values = pd.concat([cleaned_values, padding], ignore_index=True)
-                result_df[batch] = cleaned_values[:target_length]
-            else: st.warning(f"Tidak ada data numerik valid batch tebal {batch}.")
-        if result_df.empty: st.error("Tidak ada data Tebal valid."); return None
-        result_df.index = range(1, len(result_df) + 1)
-        stats_df = calculate_statistics(result_df)
-        exportable_df = pd.concat([result_df, stats_df]) 
+        exportable_df, messages = parse_tebal(file)
+        render_messages(messages)
+        if exportable_df is None: return None
 
         display_df = exportable_df.copy()
         display_df.insert(0, "Keterangan", display_df.index.map(str)) 
@@ -312,95 +216,49 @@ def parse_tebal_excel(file):
 
         st.write("Data Tebal Terstruktur dengan Statistik:")
         numeric_cols = [col for col in display_df.columns if col != "Keterangan"]
-        styled_df = apply_conditional_formatting(
+        formatted_df = apply_conditional_formatting(
             df_to_format=display_df,
             id_source_type='Keterangan', # Gunakan kolom "Keterangan" untuk bedakan baris
             numeric_cols_to_format=numeric_cols,
             stat_decimals_map=STAT_DECIMALS_PER_TEST,
             parser_origin_name="Tebal"
         )
-        st.dataframe(styled_df)
+        render_table(formatted_df, key="ipc_tebal", data_key=_table_key(data_key, "tebal"), sortable=False)
         return exportable_df
     except Exception as e:
         st.error(f"Gagal memproses file Tebal: {e}")
         st.exception(e)
         return None
 
-def parse_waktu_hancur_friability_excel(file):
+def parse_waktu_hancur_friability_excel(file, data_key=None):
     try:
-        df = pd.read_excel(file, header=None)
-        if df.empty: st.error("File Waktu Hancur/Friability kosong."); return pd.DataFrame(), pd.DataFrame()
-        # ... (logika parsing Waktu Hancur & Friability tetap sama hingga waktu_hancur_df dan friability_df) ...
-        header_row_idx = None; batch_col_idx = None; value_col_idx = None 
-        for i in range(min(10, len(df))): 
-            row_values = df.iloc[i].astype(str) 
-            if "Nomor Batch" in row_values.values:
-                header_row_idx = i
-                batch_col_idx = row_values[row_values.str.contains("Nomor Batch", case=False, na=False)].index[0]
-                if "Sample Data" in row_values.values: value_col_idx = row_values[row_values.str.contains("Sample Data", case=False, na=False)].index[0]
-                break
-        if header_row_idx is None: st.warning("Header 'Nomor Batch' tidak ditemukan..."); header_row_idx = 0; batch_col_idx = 0 
-        if value_col_idx is None: 
-            potential_value_col = 4 
-            if df.shape[1] > potential_value_col: st.warning(f"Kolom 'Sample Data' tidak ditemukan..."); value_col_idx = potential_value_col
-            else: st.error("Tidak dapat menemukan kolom data."); return pd.DataFrame(), pd.DataFrame()
-        df.columns = df.iloc[header_row_idx]; data_df = df.iloc[header_row_idx+1:].copy()
-        batch_col_name = data_df.columns[batch_col_idx]; value_col_name = data_df.columns[value_col_idx]
-        data_df = data_df[~data_df[batch_col_name].isna()]
-        friability_data_dict = {}; waktu_hancur_data_dict = {} 
-        all_friability_values = []; all_waktu_hancur_values = []
-        for _, row in data_df.iterrows():
-            batch = str(row[batch_col_name]); value_raw = row[value_col_name]
-            if pd.isna(value_raw): continue
-            try:
-                value_float = float(value_raw)
-                if 0 <= value_float < 2.5 : # Friability
-                    if batch not in friability_data_dict: friability_data_dict[batch] = value_float
-                    all_friability_values.append(value_float)
-                else: # Waktu Hancur
-                    if batch not in waktu_hancur_data_dict: waktu_hancur_data_dict[batch] = value_float
-                    all_waktu_hancur_values.append(value_float)
-            except (ValueError, TypeError): st.warning(f"Melewatkan baris batch {batch}, nilai tidak valid: {value_raw}"); continue
-        waktu_hancur_df = pd.DataFrame()
-        if waktu_hancur_data_dict:
-            batch_df_wh = pd.DataFrame(list(waktu_hancur_data_dict.items()), columns=["Batch", "Waktu Hancur"]).sort_values("Batch").reset_index(drop=True)
-            wh_min = np.min(all_waktu_hancur_values) if all_waktu_hancur_values else np.nan; wh_max = np.max(all_waktu_hancur_values) if all_waktu_hancur_values else np.nan
-            wh_mean = np.mean(all_waktu_hancur_values) if all_waktu_hancur_values else np.nan; wh_sd = np.std(all_waktu_hancur_values, ddof=1) if len(all_waktu_hancur_values) > 1 else np.nan
-            wh_rsd = (wh_sd / wh_mean * 100) if wh_mean and wh_mean != 0 else np.nan
-            stats_df_wh = pd.DataFrame({"Batch": ["Minimum", "Maximum", "Rata-rata", "Standar Deviasi", "RSD (%)"], "Waktu Hancur": [wh_min, wh_max, wh_mean, wh_sd, wh_rsd]})
-            waktu_hancur_df = pd.concat([batch_df_wh, stats_df_wh], ignore_index=True)
-        friability_df = pd.DataFrame()
-        if friability_data_dict:
-            batch_df_fr = pd.DataFrame(list(friability_data_dict.items()), columns=["Batch", "Friability"]).sort_values("Batch").reset_index(drop=True)
-            fr_min = np.min(all_friability_values) if all_friability_values else np.nan; fr_max = np.max(all_friability_values) if all_friability_values else np.nan
-            fr_mean = np.mean(all_friability_values) if all_friability_values else np.nan; fr_sd = np.std(all_friability_values, ddof=1) if len(all_friability_values) > 1 else np.nan
-            fr_rsd = (fr_sd / fr_mean * 100) if fr_mean and fr_mean != 0 else np.nan
-            stats_df_fr = pd.DataFrame({"Batch": ["Minimum", "Maximum", "Rata-rata", "Standar Deviasi", "RSD (%)"], "Friability": [fr_min, fr_max, fr_mean, fr_sd, fr_rsd]})
-            friability_df = pd.concat([batch_df_fr, stats_df_fr], ignore_index=True)
+        (waktu_hancur_df, friability_df), messages = parse_waktu_hancur_friability(file)
+        render_messages(messages)
+        if any(level == "error" for level, _ in messages): return waktu_hancur_df, friability_df
         
         if not waktu_hancur_df.empty:
             st.write("Tabel Waktu Hancur dengan Statistik:")
-            styled_wh_df = apply_conditional_formatting(
+            formatted_wh_df = apply_conditional_formatting(
                 df_to_format=waktu_hancur_df,
                 id_source_type='Batch', # Gunakan kolom "Batch" untuk bedakan baris
                 numeric_cols_to_format=["Waktu Hancur"],
                 stat_decimals_map=STAT_DECIMALS_PER_TEST,
                 parser_origin_name="Waktu Hancur"
             )
-            st.dataframe(styled_wh_df)
+            render_table(formatted_wh_df, key="ipc_waktu_hancur", data_key=_table_key(data_key, "waktu_hancur"), sortable=False)
         else:
             st.info("Tidak ada data Waktu Hancur yang diproses atau ditemukan.")
             
         if not friability_df.empty:
             st.write("Tabel Friability dengan Statistik:")
-            styled_fr_df = apply_conditional_formatting(
+            formatted_fr_df = apply_conditional_formatting(
                 df_to_format=friability_df,
                 id_source_type='Batch', # Gunakan kolom "Batch" untuk bedakan baris
                 numeric_cols_to_format=["Friability"],
                 stat_decimals_map=STAT_DECIMALS_PER_TEST,
                 parser_origin_name="Friability"
             )
-            st.dataframe(styled_fr_df)
+            render_table(formatted_fr_df, key="ipc_friability", data_key=_table_key(data_key, "friability"), sortable=False)
         else:
             st.info("Tidak ada data Friability yang diproses atau ditemukan.")
             
@@ -411,11 +269,7 @@ def parse_waktu_hancur_friability_excel(file):
         return pd.DataFrame(), pd.DataFrame()
 
 def get_excel_for_download(df, index=True):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=index) 
-    output.seek(0) 
-    return output
+    return to_xlsx_bytes(df, index=index)
 
 def tampilkan_ipc():
     st.title("Halaman IPC")
@@ -452,26 +306,28 @@ def tampilkan_ipc():
     
     if uploaded_file:
         file_copy = io.BytesIO(uploaded_file.getvalue()) 
+        # Identitas isi upload (di-hash sekali per upload) untuk kunci cache tabel tampilan
+        data_key = upload_key(uploaded_file, uploader_key)
         st.success(f"File untuk pengujian {selected_option} berhasil diupload: {uploaded_file.name}")
         st.subheader(f"Hasil Pengujian {selected_option}")
         
         df_result = None; df_result_wh = None; df_result_fr = None
 
         if selected_option == "Kekerasan":
-            df_result = parse_kekerasan_excel(file_copy)
+            df_result = parse_kekerasan_excel(file_copy, data_key)
             if df_result is not None and not df_result.empty:
                 excel_bytes_io = get_excel_for_download(df_result, index=True)
                 st.download_button(label=f"📥 Download Data Kekerasan", data=excel_bytes_io, file_name="data_kekerasan.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
             elif df_result is not None: st.info("Tidak ada data kekerasan valid.")
         elif selected_option == "Keseragaman Bobot":
-            df_result = parse_keseragaman_bobot_excel(file_copy)
+            df_result = parse_keseragaman_bobot_excel(file_copy, data_key)
             if df_result is not None and not df_result.empty:
                 excel_bytes_io = get_excel_for_download(df_result, index=True)
                 st.download_button(label=f"📥 Download Data Keseragaman Bobot", data=excel_bytes_io, file_name="data_keseragaman_bobot.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
             elif df_result is not None: st.info("Tidak ada data keseragaman bobot valid.")
         
         elif selected_option == "Keseragaman Bobot Effervescent":
-            df_result = parse_keseragaman_bobot_effervescent_excel(file_copy)
+            df_result = parse_keseragaman_bobot_effervescent_excel(file_copy, data_key)
             if df_result is not None and not df_result.empty:
                 excel_bytes_io = get_excel_for_download(df_result, index=False)
                 st.download_button(
@@ -484,13 +340,13 @@ def tampilkan_ipc():
                 st.info("Tidak ada data Keseragaman Bobot Effervescent valid.")
 
         elif selected_option == "Tebal":
-            df_result = parse_tebal_excel(file_copy) 
+            df_result = parse_tebal_excel(file_copy, data_key) 
             if df_result is not None and not df_result.empty:
                 excel_bytes_io = get_excel_for_download(df_result, index=True)
                 st.download_button(label=f"📥 Download Data Tebal", data=excel_bytes_io, file_name="data_tebal.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
             elif df_result is not None: st.info("Tidak ada data tebal valid.")
         elif selected_option == "Waktu Hancur dan Friability":
-            df_result_wh, df_result_fr = parse_waktu_hancur_friability_excel(file_copy)
+            df_result_wh, df_result_fr = parse_waktu_hancur_friability_excel(file_copy, data_key)
             if df_result_wh is not None and not df_result_wh.empty:
                 excel_bytes_io_wh = get_excel_for_download(df_result_wh, index=False) 
                 st.download_button(label="📥 Download Data Waktu Hancur", data=excel_bytes_io_wh, file_name="data_waktu_hancur.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="download_wh")
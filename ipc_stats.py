@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Mesin statistik IPC: semua statistik untuk semua kolom batch dihitung sekaligus
+# dari satu array 2-D (satu baris per batch), nilai kosong (NaN) diabaikan.
+
+BASIC_STATS = ['MIN', 'MAX', 'MEAN', 'SD', 'RSD (%)']
+EXTRA_STATS = ['MEDIAN', 'N', 'Cp', 'Cpk']
+
+
+def _to_float_matrix(df):
+    # Kolom non-numerik dikonversi seperti pd.to_numeric(errors='coerce'); nilai tidak valid menjadi NaN
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in df.dtypes):
+        values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        columns = [
+            pd.to_numeric(df.iloc[:, pos], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            for pos in range(df.shape[1])
+        ]
+        values = np.column_stack(columns) if columns else np.empty((len(df), 0))
+    # Satu baris per batch agar reduksi berjalan di sumbu yang bersebelahan di memori
+    return np.ascontiguousarray(values.T)
+
+
+def compute_statistics(values, extras=(), lsl=None, usl=None, skipna=True):
+    """
+    Menghitung statistik per baris dari array 2-D (baris = batch, kolom = data).
+
+    Hasilnya sama dengan Series.min/max/mean/std(ddof=1) pandas per batch.
+    RSD (%) = SD / MEAN * 100 (NaN jika MEAN 0). Statistik tambahan (extras):
+    MEDIAN, N (jumlah data valid), Cp dan Cpk terhadap batas spesifikasi lsl/usl.
+    Cp butuh kedua batas; Cpk memakai sisi yang tersedia.
+
+    Dengan skipna=False, batch yang mengandung NaN mendapat NaN untuk semua statistik
+    kecuali N, sama seperti np.min/np.mean/np.std yang meneruskan NaN.
+
+    Returns:
+        dict nama statistik -> array float64 (satu nilai per batch)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    count = present.sum(axis=1)
+    has_data = count > 0
+
+    # Nilai valid digeser ke depan (urutan tetap), lalu batch dengan jumlah data sama
+    # dihitung bersama dari blok padat tanpa NaN. Urutan penjumlahan jadi sama persis
+    # dengan Series.dropna().mean()/std() pandas sehingga hasilnya identik
+    order = np.argsort(~present, axis=1, kind='stable')
+    compacted = np.take_along_axis(values, order, axis=1)
+
+    mean = np.full(len(values), np.nan)
+    sd = np.full(len(values), np.nan)
+    for n in np.unique(count[has_data]):
+        rows = count == n
+        block = np.ascontiguousarray(compacted[rows, :n])
+        block_mean = block.sum(axis=1) / n
+        mean[rows] = block_mean
+        if n > 1:
+            sd[rows] = np.sqrt(((block_mean[:, None] - block) ** 2).sum(axis=1) / (n - 1))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsd = np.where(mean != 0, sd / mean * 100, np.nan)
+
+    minimum = np.where(present, values, np.inf).min(axis=1, initial=np.inf)
+    maximum = np.where(present, values, -np.inf).max(axis=1, initial=-np.inf)
+    minimum[~has_data] = np.nan
+    maximum[~has_data] = np.nan
+
+    stats = {'MIN': minimum, 'MAX': maximum, 'MEAN': mean, 'SD': sd, 'RSD (%)': rsd}
+
+    for name in extras:
+        if name == 'MEDIAN':
+            with warnings.catch_warnings():
+                # Batch tanpa data menghasilkan NaN; peringatan "All-NaN slice" tidak perlu ditampilkan
+                warnings.simplefilter('ignore', RuntimeWarning)
+                stats['MEDIAN'] = np.nanmedian(values, axis=1) if values.shape[1] else np.full(len(values), np.nan)
+        elif name == 'N':
+            stats['N'] = count.astype(np.float64)
+        elif name == 'Cp':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stats['Cp'] = (usl - lsl) / (6 * sd) if lsl is not None and usl is not None else np.full(len(values), np.nan)
+        elif name == 'Cpk':
+            sides = []
+            if usl is not None:
+                sides.append(usl - mean)
+            if lsl is not None:
+                sides.append(mean - lsl)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stats['Cpk'] = np.minimum.reduce(sides) / (3 * sd) if sides else np.full(len(values), np.nan)
+        else:
+            raise ValueError(f"Statistik tidak dikenal: {name}")
+
+    if not skipna:
+        has_nan = count < values.shape[1]
+        for name in stats:
+            if name != 'N':
+                stats[name][has_nan] = np.nan
+
+    return stats
+
+
+def describe_batches(df, extras=(), lsl=None, usl=None):
+    """
+    Statistik untuk setiap kolom batch dalam dataframe, dihitung dalam satu reduksi.
+
+    Parameters:
+    df (DataFrame): satu kolom per batch, baris berisi data pengujian
+    extras (list): statistik tambahan dari EXTRA_STATS
+    lsl, usl (float): batas spesifikasi bawah/atas untuk Cp/Cpk
+
+    Returns:
+    DataFrame: baris = statistik (MIN, MAX, MEAN, SD, RSD (%), lalu extras), kolom = batch
+    """
+    stats = compute_statistics(_to_float_matrix(df), extras=extras, lsl=lsl, usl=usl)
+    stats_df = pd.DataFrame(np.vstack(list(stats.values())), columns=df.columns)
+    stats_df.index = list(stats)
+    return stats_df
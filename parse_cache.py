@@ -0,0 +1,120 @@
+import copy
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from excel_loader import read_file_bytes
+
+# Jumlah hasil parsing yang disimpan sebelum entri paling lama tidak dipakai dibuang
+DEFAULT_MAX_ENTRIES = 16
+
+
+def _copy_result(result):
+    # Kembalikan salinan agar halaman yang mengubah DataFrame tidak merusak isi cache
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy_result(item) for item in result)
+    if isinstance(result, list):
+        return [_copy_result(item) for item in result]
+    if isinstance(result, dict):
+        return {key: _copy_result(value) for key, value in result.items()}
+    return copy.copy(result)
+
+
+class ParseCache:
+    """
+    Cache LRU untuk hasil parsing file upload.
+    Kunci cache: hash isi file + nama parser + opsi parser (mis. mode gabung, baris awal).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content, parser_name, options):
+        digest = hashlib.sha256(content).hexdigest()
+        return (digest, parser_name, tuple(sorted(options.items())))
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_parse(self, file, parser_name, parse_func, **options):
+        """
+        Ambil hasil parsing dari cache, atau jalankan parse_func(file_bytesio, **options)
+        lalu simpan hasilnya.
+        """
+        return self.get_or_parse_with_key(file, parser_name, parse_func, **options)[0]
+
+    def get_or_parse_with_key(self, file, parser_name, parse_func, **options):
+        """
+        Sama dengan get_or_parse, tetapi mengembalikan (hasil, kunci cache). Kunci ini bisa dipakai
+        sebagai data_key tabel/tombol download sehingga file tidak perlu di-hash untuk kedua kalinya.
+        """
+        content = read_file_bytes(file)
+        key = self.make_key(content, parser_name, options)
+
+        result = self.get(key)
+        if result is None:
+            result = parse_func(io.BytesIO(content), **options)
+            self.put(key, result)
+
+        return _copy_result(result), key
+
+
+# Cache bersama tingkat proses, tetap hidup di antara rerun Streamlit
+_parse_cache = ParseCache()
+
+
+def cached_parse(file, parser_name, parse_func, **options):
+    return _parse_cache.get_or_parse(file, parser_name, parse_func, **options)
+
+
+def cached_parse_with_key(file, parser_name, parse_func, **options):
+    return _parse_cache.get_or_parse_with_key(file, parser_name, parse_func, **options)
+
+
+def content_key(file, parser_name, **options):
+    """
+    Kunci hasil parsing (hash isi file + parser + opsi), sama dengan kunci cached_parse.
+    Untuk hasil cached_parse pakai cached_parse_with_key agar file tidak di-hash dua kali.
+    """
+    return ParseCache.make_key(read_file_bytes(file), parser_name, options)
+
+
+def _read_excel(file, **read_kwargs):
+    return pd.read_excel(file, **read_kwargs)
+
+
+def _read_csv(file, **read_kwargs):
+    return pd.read_csv(file, **read_kwargs)
+
+
+def read_excel_cached(file, **read_kwargs):
+    """pd.read_excel dengan hasil yang di-cache berdasarkan isi file dan argumen."""
+    return cached_parse(file, "read_excel", _read_excel, **read_kwargs)
+
+
+def read_csv_cached(file, **read_kwargs):
+    """pd.read_csv dengan hasil yang di-cache berdasarkan isi file dan argumen."""
+    return cached_parse(file, "read_csv", _read_csv, **read_kwargs)
@@ -0,0 +1,318 @@
+import json
+import os
+
+import pandas as pd
+
+# Logika CPP Produk Obat tanpa Streamlit. Fungsi parser mengembalikan (hasil, messages);
+# messages berisi tuple (level, teks) yang ditampilkan oleh halaman produk_obat.
+
+# Kata kunci untuk mengenali sel yang berisi nama mesin
+MACHINE_KEYWORDS = ["hassia", "sacklok", "redatron", "packaging", "machine", "vietnam"]
+
+
+def _is_valid_batch(batch):
+    # batch sudah berupa str(...).strip(); "nan" berasal dari sel kosong
+    return bool(batch) and batch.upper() != "NAN" and not pd.isna(batch)
+
+
+def _pad_batch_lists(mesin_map):
+    # Samakan panjang list batch per mesin (diisi None) agar bisa dijadikan DataFrame
+    max_length = max([len(v) for v in mesin_map.values()]) if mesin_map else 0
+    return {k: v + [None] * (max_length - len(v)) for k, v in mesin_map.items()}
+
+
+def parse_kode_mesin_kamboja(file):
+    """
+    Mengelompokkan batch berdasarkan kode mesin (format Kamboja).
+    Baris "Kode Mesin" di kolom D memulai kelompok baru, kode mesinnya di kolom F,
+    dan nomor batch di kolom A baris-baris berikutnya masuk ke kode mesin tersebut.
+
+    Mengembalikan (hasil, messages); hasil berisi mesin_map, summary_df, result_df,
+    filtered_display_df (tanpa baris "Kalibrasi Ulang"), dan jumlah_baris_asli.
+    """
+    messages = []
+    df = pd.read_excel(file, header=None)
+
+    # Hapus baris yang berisi "Kalibrasi Ulang" di kolom D (index 3)
+    filtered_display_df = df[~df[3].astype(str).str.contains("Kalibrasi Ulang", na=False)]
+
+    # Loop melalui seluruh baris data asli (bukan yang difilter)
+    mesin_map = {}
+    current_mesin = None
+    for label, mesin, batch_value in zip(df[3].tolist(), df[5].tolist(), df[0].tolist()):
+        if str(label).strip() == "Kode Mesin":
+            current_mesin = str(mesin).strip()
+            if current_mesin not in mesin_map:
+                mesin_map[current_mesin] = []
+        elif current_mesin is not None:
+            batch = str(batch_value).strip()
+            if _is_valid_batch(batch):
+                mesin_map[current_mesin].append(batch)
+
+    summary_df = pd.DataFrame([
+        {"Kode Mesin": mesin, "Jumlah Batch": len(batches)}
+        for mesin, batches in mesin_map.items()
+    ])
+    result_df = pd.DataFrame(_pad_batch_lists(mesin_map))
+
+    result = {
+        "mesin_map": mesin_map,
+        "summary_df": summary_df,
+        "result_df": result_df,
+        "filtered_display_df": filtered_display_df,
+        "jumlah_baris_asli": len(df),
+    }
+    return result, messages
+
+
+def filter_batches_by_mesin(filtered_display_df, mesin_map, mesin_to_keep):
+    """
+    Menyimpan hanya baris dengan batch dari kode mesin yang dipilih (baris tanpa batch tetap disimpan).
+
+    Mengembalikan ((filtered_df, filtered_mesin_map, batches_to_keep), messages).
+    filtered_df bernilai None jika mesin yang dipilih tidak memiliki batch.
+    """
+    messages = []
+    batches_to_keep = []
+    for mesin in mesin_to_keep:
+        batches_to_keep.extend([b for b in mesin_map[mesin] if b is not None])
+
+    if not batches_to_keep:
+        messages.append(("warning", "Tidak ada batch yang dapat disimpan dari mesin yang dipilih."))
+        return (None, {}, batches_to_keep), messages
+
+    keep = set(batches_to_keep)
+    # str() per sel, bukan astype(str): kolom bertipe str menyimpan sel kosong sebagai NaN
+    mask = [
+        batch in keep or batch == "" or batch.upper() == "NAN"
+        for batch in (str(value).strip() for value in filtered_display_df.iloc[:, 0].tolist())
+    ]
+    filtered_df = filtered_display_df[mask]
+
+    filtered_mesin_map = {mesin: [b for b in mesin_map[mesin] if b is not None] for mesin in mesin_to_keep}
+    return (filtered_df, filtered_mesin_map, batches_to_keep), messages
+
+
+def parse_kode_mesin_vietnam(file):
+    """
+    Semua batch di kolom A (mulai baris kedua) dikelompokkan ke satu kode mesin "Olsa Mames".
+
+    Mengembalikan (hasil, messages); hasil berisi mesin_map, summary_df, result_df, dan jumlah_baris_asli.
+    """
+    messages = []
+    df = pd.read_excel(file, header=None)
+
+    vietnam_batches = []
+    for batch_value in df.iloc[1:, 0].tolist():
+        batch = str(batch_value).strip()
+        if _is_valid_batch(batch):
+            vietnam_batches.append(batch)
+
+    result = {
+        "mesin_map": {"Olsa Mames": vietnam_batches},
+        "summary_df": pd.DataFrame([{"Kode Mesin": "Olsa Mames", "Jumlah Batch": len(vietnam_batches)}]),
+        "result_df": pd.DataFrame({"Olsa Mames": pd.Series(vietnam_batches)}),
+        "jumlah_baris_asli": len(df),
+    }
+    return result, messages
+
+
+def valid_batches_from_mesin_map(mesin_map):
+    """Daftar batch (string) dari hasil Tab 1, dipakai sebagai filter di Tab 2."""
+    valid_filter_batches = []
+    for batches in mesin_map.values():
+        if batches:
+            valid_filter_batches.extend([str(b).strip() for b in batches if b is not None])
+    return valid_filter_batches
+
+
+def find_machine_names(df):
+    """
+    Mencari kandidat nama mesin di seluruh sel (berdasarkan MACHINE_KEYWORDS),
+    ditambah teks pendek di sel kiri/kanannya sebagai konteks.
+    """
+    values = df.to_numpy(dtype=object)
+    n_cols = values.shape[1] if values.ndim == 2 else 0
+
+    all_machine_names = []
+    for row in values:
+        for col in range(n_cols):
+            cell_value = str(row[col]).strip()
+            if not _is_valid_batch(cell_value):
+                continue
+
+            cell_lower = cell_value.lower()
+            if any(keyword in cell_lower for keyword in MACHINE_KEYWORDS):
+                machine_candidate = cell_value
+
+                if col > 0 and not pd.isna(row[col - 1]):
+                    prev_text = str(row[col - 1]).strip()
+                    if prev_text and len(prev_text) < 30:
+                        machine_candidate = f"{prev_text} {machine_candidate}"
+
+                if col < n_cols - 1 and not pd.isna(row[col + 1]):
+                    next_text = str(row[col + 1]).strip()
+                    if next_text and len(next_text) < 30:
+                        machine_candidate = f"{machine_candidate} {next_text}"
+
+                machine_candidate = " ".join(machine_candidate.split())
+                if len(machine_candidate) > 5 and machine_candidate not in all_machine_names:
+                    all_machine_names.append(machine_candidate)
+
+    return all_machine_names
+
+
+def group_machine_names(all_machine_names):
+    """Memetakan nama mesin yang ditemukan ke nama kanonik (HASSIA REDATRON / SACKLOK 00001)."""
+    machine_groups = {}
+    for name in all_machine_names:
+        name_lower = name.lower()
+        if "hassia" in name_lower or "redatron" in name_lower:
+            machine_groups[name] = "HASSIA REDATRON"
+        elif "sacklok" in name_lower:
+            machine_groups[name] = "SACKLOK 00001"
+        else:
+            machine_groups[name] = name
+    return machine_groups
+
+
+def parse_nama_mesin(file, valid_filter_batches):
+    """
+    Mengelompokkan batch (kolom A) berdasarkan nama mesin yang disebut di baris yang sama.
+    Hanya batch yang ada di valid_filter_batches (hasil Tab 1) yang diproses.
+
+    Mengembalikan (hasil, messages); hasil berisi mesin_batch_groups, mesin_original,
+    summary_df, result_table, dan result_df (None jika tidak ada batch yang cocok).
+    """
+    messages = []
+    df = pd.read_excel(file, header=None)
+    valid_filter_batches = set(valid_filter_batches)
+
+    all_machine_names = find_machine_names(df)
+    if not all_machine_names:
+        all_machine_names.extend(["HASSIA REDATRON", "SACKLOK 00001"])
+    machine_groups = group_machine_names(all_machine_names)
+
+    mesin_batch_groups = {}
+    mesin_original = {}
+
+    for row in df.to_numpy(dtype=object):
+        batch = str(row[0]).strip()
+        if not _is_valid_batch(batch) or batch == "-" or batch not in valid_filter_batches:
+            continue
+
+        # Cari nama mesin di seluruh teks baris
+        row_str = ' '.join([str(value).lower() for value in row if not pd.isna(value)])
+        for machine_name, canonical_machine in machine_groups.items():
+            if machine_name.lower() in row_str:
+                mesin_batch_groups.setdefault(canonical_machine, [])
+                mesin_original.setdefault(canonical_machine, [])
+
+                if machine_name not in mesin_original[canonical_machine]:
+                    mesin_original[canonical_machine].append(machine_name)
+
+                mesin_batch_groups[canonical_machine].append(batch)
+                break
+
+    mesin_batch_groups = {k: v for k, v in mesin_batch_groups.items() if v}
+
+    summary_df = pd.DataFrame([
+        {
+            "Nama Mesin": mesin,
+            "Jumlah Batch": len(batches),
+            "Kode/Nama Asli": ", ".join(mesin_original.get(mesin, [mesin])),
+        }
+        for mesin, batches in mesin_batch_groups.items()
+    ])
+
+    result_table = pd.DataFrame([
+        {
+            "Nama Mesin": mesin,
+            "Jumlah Batch": len(batches),
+            "Contoh Batch": ", ".join(batches[:5]) + ("..." if len(batches) > 5 else ""),
+            "Kode/Nama Asli": ", ".join(mesin_original.get(mesin, [mesin])),
+        }
+        for mesin, batches in mesin_batch_groups.items()
+    ])
+
+    result_df = pd.DataFrame(_pad_batch_lists(mesin_batch_groups)) if mesin_batch_groups else None
+
+    result = {
+        "mesin_batch_groups": mesin_batch_groups,
+        "mesin_original": mesin_original,
+        "summary_df": summary_df,
+        "result_table": result_table,
+        "result_df": result_df,
+    }
+    return result, messages
+
+
+def save_batch_reference(mesin_map, filename):
+    """
+    Menyimpan referensi batch-mesin ke file JSON. Mengembalikan (berhasil, messages).
+    """
+    try:
+        # Batch None dibuang dan setiap batch hanya disimpan sekali
+        reference_data = {mesin: list(set([b for b in batches if b is not None])) for mesin, batches in mesin_map.items()}
+        with open(filename, 'w') as f:
+            json.dump(reference_data, f)
+        return True, [("success", f"Referensi batch-mesin berhasil disimpan ke {filename}")]
+    except Exception as e:
+        return False, [("error", f"Gagal menyimpan referensi batch-mesin: {str(e)}")]
+
+
+def load_batch_reference(filename):
+    """
+    Memuat referensi batch-mesin dari file JSON. Mengembalikan (reference_data, messages).
+    """
+    try:
+        if not os.path.exists(filename):
+            return {}, [("warning", f"File referensi {filename} tidak ditemukan")]
+
+        with open(filename, 'r') as f:
+            reference_data = json.load(f)
+        return reference_data, [("success", f"Referensi batch-mesin berhasil dimuat dari {filename}")]
+    except Exception as e:
+        return {}, [("error", f"Gagal memuat referensi batch-mesin: {str(e)}")]
+
+
+def parse_batch_only(file):
+    """
+    Parsing file yang hanya berisi batch tanpa informasi mesin. Mengembalikan (df, batch_list).
+    """
+    df = pd.read_excel(file, header=None)
+    batch_list = [batch for batch in (str(v).strip() for v in df.iloc[:, 0].tolist()) if _is_valid_batch(batch)]
+    return df, batch_list
+
+
+def split_grinding_by_mesin(file_grinding, reference_data):
+    """
+    Memisahkan file grinding menjadi beberapa bagian berdasarkan batch yang sudah diklasifikasi dengan nama mesin.
+    Header "Nomor Batch" selalu di A1, tapi data bisa mulai dari baris 2, 3, dst (skip baris kosong).
+    Batch yang tidak ada di referensi masuk ke "Unclassified". Mengembalikan (hasil_per_mesin, messages).
+    """
+    # Baca file Excel dengan header di baris 1, tapi tetap baca semua baris (termasuk yang kosong)
+    df = pd.read_excel(file_grinding, header=0, keep_default_na=False)
+
+    if "Nomor Batch" not in df.columns:
+        raise ValueError("Kolom 'Nomor Batch' tidak ditemukan dalam file grinding.")
+
+    df["Nomor Batch"] = df["Nomor Batch"].astype(str).str.strip()
+    df_clean = df[~df["Nomor Batch"].isin(['', 'nan', 'NaN', 'None'])].copy()
+    df_clean.reset_index(drop=True, inplace=True)
+
+    # Ringkasan data yang terbaca, ditampilkan sebagai pesan info
+    messages = [("info", f"Total baris setelah cleaning: {len(df_clean)}")]
+    if len(df_clean) > 0:
+        messages.append(("info", f"5 batch pertama: {df_clean['Nomor Batch'].head().tolist()}"))
+
+    hasil_per_mesin = {}
+    batch_terklasifikasi = []
+    for mesin, daftar_batch in reference_data.items():
+        daftar_batch_bersih = [str(b).strip() for b in daftar_batch if str(b).strip() != '']
+        df_filtered = df_clean[df_clean["Nomor Batch"].isin(daftar_batch_bersih)]
+        hasil_per_mesin[mesin] = df_filtered
+        batch_terklasifikasi.extend(df_filtered["Nomor Batch"].tolist())
+
+    hasil_per_mesin["Unclassified"] = df_clean[~df_clean["Nomor Batch"].isin(batch_terklasifikasi)]
+    return hasil_per_mesin, messages
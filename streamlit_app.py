@@ -1,19 +1,18 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import re
-import io
-import base64
 import matplotlib.pyplot as plt
-from openpyxl import load_workbook
 
 # --- SET PAGE CONFIG
 st.set_page_config(page_title="Excel CQA Parser", layout="wide")
 
 # Modul internal
 from navbar import render_navbar
-from utils import combine_duplicate_columns
-from header_parser import extract_multi_level_headers
+from cqa_loader import load_cqa_dataframe
+from excel_export import XLSX_MIME, to_xlsx_bytes
+from parse_cache import cached_parse_with_key
+from table_view import render_table
+from ui_utils import lazy_download_button
 from ipc_page import tampilkan_ipc
 from bahan_page import tampilkan_bahan
 from filter_labelqc import tampilkan_filter_labelqc
@@ -75,52 +74,17 @@ merge_mode_key = "gabung" if merge_mode == "Gabung [Nilai] & [Teks]" else "pisah
 
 st.info(f"Mode dipilih: **{merge_mode}**")
 
-# Fungsi parsing header bertingkat dari baris 4-6
-def extract_multi_level_headers(excel_file, start_row=4, num_levels=3):
-    wb = load_workbook(excel_file, data_only=True)
-    ws = wb.active
-
-    headers = []
-    max_col = ws.max_column
-
-    def simplify_main_header(header_text):
-        if "-" in header_text:
-            return header_text.split("-")[0].strip()
-        return header_text.strip()
-
-    for col in range(1, max_col + 1):
-        levels = []
-        for row in range(start_row, start_row + num_levels):
-            cell = ws.cell(row=row, column=col)
-
-            for merged_range in ws.merged_cells.ranges:
-                if cell.coordinate in merged_range:
-                    cell = ws.cell(row=merged_range.min_row, column=merged_range.min_col)
-                    break
-
-            value = str(cell.value).strip() if cell.value else ""
-            levels.append(value)
-
-        # Kolom A, B, C khusus ambil 1 level pertama
-        if col <= 3:
-            headers.append(levels[0])    
-        else:
-            # Header utama disingkat
-            simplified_main = levels[0]
-            combined = " > ".join([simplified_main] + levels[1:])
-            headers.append(combined)
-
-    return headers
-
-# Fungsi untuk mengeksport DataFrame ke Excel
-def export_dataframe(df, filename="data_export"):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-    b64 = base64.b64encode(output.read()).decode()
-    href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}.xlsx">📥 Download Excel File</a>'
-    return href
+# Fungsi untuk mengeksport DataFrame ke Excel (file baru dibuat saat diminta, lalu di-cache)
+def export_dataframe(df, filename="data_export", data_key=None):
+    lazy_download_button(
+        label="📥 Download Excel File",
+        build=lambda: to_xlsx_bytes(df),
+        frames=None if data_key is not None else [df],
+        file_name=f"{filename}.xlsx",
+        mime=XLSX_MIME,
+        key=f"download_{filename}",
+        data_key=data_key,
+    )
 
 # === UPLOAD FILE ===
 st.subheader("📁 Upload File Excel")
@@ -129,91 +93,16 @@ uploaded_file = st.file_uploader("Upload file Excel (.xlsx)", type=["xlsx", "ods
 if uploaded_file is not None:
     # --- Proses Data ---
 
-    # Ambil header dari baris 4-6
-    combined_headers = extract_multi_level_headers(uploaded_file, start_row=4, num_levels=3)
-
-    # Baca data Excel (mulai dari baris ke-7)
-    df = pd.read_excel(uploaded_file, skiprows=6, header=None)
-    df.columns = combined_headers
-    
-    # Deteksi dan konversi otomatis ke float
-    for col in df.columns:
-        sample = df[col].dropna().astype(str)
-
-        decimal_like_count = sample.apply(lambda x: bool(re.match(r'^\d+([.,]\d+)?$', x.strip()))).sum()
-
-        if len(sample) > 0 and decimal_like_count / len(sample) > 0.3:
-            def safe_float(x):
-                x = x.replace(",", ".").strip()
-                if re.match(r'^\d+(\.\d+)?$', x):
-                    return float(x)
-                return pd.NA
+    # Baca dan bersihkan data (hasil parsing di-cache berdasarkan isi file + mode)
+    # Kunci cache parsing dipakai ulang: tabel dan file ekspor tidak perlu meng-hash df setiap rerun
+    df, cqa_key = cached_parse_with_key(uploaded_file, "cqa", load_cqa_dataframe, merge_mode=merge_mode_key)
 
-            df[col] = sample.apply(safe_float)
-
-    # Hapus baris yang mengandung 'Rata-rata', 'SD', atau 'RSD' di kolom A
-    df = df[~df.iloc[:, 0].astype(str).str.contains("Average|SD|UCL", na=False)]
-    
- 
-    
-    # === GUNAKAN MODE YANG DIPILIH SEBELUMNYA ===
-    # Gabungkan kolom duplikat berdasarkan mode yang dipilih di awal
-    df = combine_duplicate_columns(df, mode=merge_mode_key)
-    
     # === DEBUGGING: Tampilkan kolom setelah pemrosesan ===
     st.write(f"Jumlah kolom: {len(df.columns)}")
 
-    # Reset index
-    df = df.reset_index(drop=True) 
-
-    # Perbaiki data kosong dalam batch
-    current_batch = None
-    batch_rows = []
-
-    for idx in range(len(df)):
-        batch_value = df.loc[idx, "Nomor Batch"] if "Nomor Batch" in df.columns else None
-
-        if pd.notna(batch_value):
-            if batch_rows:
-                for col in df.columns:
-                    for row_idx in batch_rows:
-                        if pd.isna(df.loc[row_idx, col]):
-                            for search_idx in batch_rows:
-                                if search_idx > row_idx and pd.notna(df.loc[search_idx, col]):
-                                    df.loc[row_idx, col] = df.loc[search_idx, col]
-                                    df.loc[search_idx, col] = None
-                                    break
-                batch_rows = []
-            current_batch = batch_value
-            batch_rows = [idx]
-        else:
-            if current_batch is not None:
-                batch_rows.append(idx)
-
-    if batch_rows:
-        for col in df.columns:
-            for row_idx in batch_rows:
-                if pd.isna(df.loc[row_idx, col]):
-                    for search_idx in batch_rows:
-                        if search_idx > row_idx and pd.notna(df.loc[search_idx, col]):
-                            df.loc[row_idx, col] = df.loc[search_idx, col]
-                            df.loc[search_idx, col] = None
-                            break
-
-    # Isi Nomor Batch kosong dari atas
-    if "Nomor Batch" in df.columns:
-        df["Nomor Batch"] = df["Nomor Batch"].fillna(method="ffill")
-
-    # Hapus baris kosong semua
-    df = df.dropna(how="all")
-
-    # Hapus baris yang cuma punya Nomor Batch saja
-    cols_to_check = [col for col in df.columns if col != "Nomor Batch"]
-    df = df.dropna(subset=cols_to_check, how="all")
-
     # --- Tampilkan Data Hasil ---
     st.subheader(f"📄 Data Hasil Pemrosesan (Mode: {merge_mode}):")
-    st.dataframe(df)
+    render_table(df, key="cqa_hasil", data_key=cqa_key)
 
     # Tampilkan informasi tentang mode yang digunakan
     if merge_mode_key == "gabung":
@@ -222,8 +111,7 @@ if uploaded_file is not None:
         st.info("ℹ️ Kolom dengan sufiks [Nilai] dan [Teks] tetap dipisahkan dan diurutkan berdekatan.")
 
     # Tambahkan tombol ekspor untuk data utama
-    export_link = export_dataframe(df, f"data_lengkap_{merge_mode_key}")
-    st.markdown(export_link, unsafe_allow_html=True)
+    export_dataframe(df, f"data_lengkap_{merge_mode_key}", data_key=cqa_key)
 
     # --- Tombol untuk memilih fitur ---
     st.subheader("🔍 Pilih Fitur yang Ingin Digunakan")
@@ -318,19 +206,17 @@ if uploaded_file is not None:
                 df_combined = pd.concat([df_data, df_stats], ignore_index=True)
                 
                 st.subheader("📄 Data Hasil Pemilihan Kolom")
-                st.dataframe(df_combined)
+                render_table(df_combined, key="cqa_kolom_statistik")
                 
                 # Ekspor data gabungan
-                export_link_filtered = export_dataframe(df_combined, "data_filtered")
-                st.markdown(export_link_filtered, unsafe_allow_html=True)
+                export_dataframe(df_combined, "data_filtered")
             else:
                 # Jika tidak ada kolom numerik, tampilkan data biasa
                 st.subheader("📄 Data Hasil Pemilihan Kolom")
-                st.dataframe(df_filtered)
+                render_table(df_filtered, key="cqa_kolom")
                 
                 # Ekspor data biasa
-                export_link_filtered = export_dataframe(df_filtered, "data_filtered")
-                st.markdown(export_link_filtered, unsafe_allow_html=True)
+                export_dataframe(df_filtered, "data_filtered")
         
         else:
             st.info("Silakan pilih minimal satu kolom untuk ditampilkan.")
@@ -363,12 +249,11 @@ if uploaded_file is not None:
                     selected_columns_right = df.columns[batch_idx:]
 
                     st.subheader(f"📄 Data dari Batch yang Dipilih dan Kolom Ke Kanan:")
-                    st.dataframe(batch_rows[selected_columns_right])
+                    render_table(batch_rows[selected_columns_right], key="cqa_batch_kanan")
                     
                     # Tambahkan tombol ekspor untuk data batch
                     batch_names = "_".join(map(str, selected_batches))
-                    export_link = export_dataframe(batch_rows[selected_columns_right], f"data_batch_{batch_names}")
-                    st.markdown(export_link, unsafe_allow_html=True)
+                    export_dataframe(batch_rows[selected_columns_right], f"data_batch_{batch_names}")
                     
                     # # === Tambahan: Chart dari kolom numerik ===
                     # st.subheader("📊 Visualisasi Data (Chart)")
@@ -0,0 +1,187 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from parse_cache import ParseCache
+
+# Komponen tabel bersama: hanya potongan baris/kolom yang sedang dilihat yang dikirim ke browser.
+# Filter dan urutan dihitung di server; potongan yang sudah diubah ke Arrow disimpan di cache
+# sehingga rerun Streamlit (mis. klik tombol lain) tidak menserialisasi ulang tabel.
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_COLUMNS = 30
+
+# Posisi baris hasil filter/urut dan potongan Arrow, dibagi oleh semua sesi dalam proses
+_positions_cache = ParseCache(max_entries=32)
+_chunk_cache = ParseCache(max_entries=64)
+
+
+def frame_fingerprint(df):
+    """
+    Hash isi DataFrame (nilai, index, nama kolom, dan dtype) untuk kunci cache.
+    """
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    except TypeError:
+        # Sel yang tidak bisa di-hash (mis. list) di-hash dari teksnya
+        row_hashes = pd.util.hash_pandas_object(df.astype(str), index=True).to_numpy()
+
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(repr(df.dtypes.astype(str).tolist()).encode())
+    return digest.hexdigest()
+
+
+def filter_positions(df, query):
+    """
+    Posisi baris yang salah satu selnya memuat teks query (huruf besar/kecil diabaikan).
+    """
+    if not query:
+        return np.arange(len(df))
+
+    mask = np.zeros(len(df), dtype=bool)
+    for pos in range(df.shape[1]):
+        column = df.iloc[:, pos]
+        text = column.astype(object).where(column.notna(), "").astype(str)
+        mask |= text.str.contains(query, case=False, regex=False).to_numpy(dtype=bool)
+    return np.flatnonzero(mask)
+
+
+def sort_positions(df, positions, sort_column, ascending=True):
+    """
+    Mengurutkan posisi baris berdasarkan kolom ke-sort_column (stabil, nilai kosong di akhir).
+    Kolom dengan tipe campuran diurutkan sebagai teks.
+    """
+    values = df.iloc[positions, sort_column].reset_index(drop=True)
+    try:
+        order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index
+    except TypeError:
+        text = values.astype(object).where(values.notna(), None)
+        text = text.map(lambda value: value if value is None else str(value))
+        order = text.sort_values(ascending=ascending, kind="stable", na_position="last").index
+    return positions[order.to_numpy()]
+
+
+def _cached_positions(df, fingerprint, query, sort_column, ascending):
+    key = (fingerprint, query, sort_column, ascending)
+    positions = _positions_cache.get(key)
+    if positions is None:
+        positions = filter_positions(df, query)
+        if sort_column is not None:
+            positions = sort_positions(df, positions, sort_column, ascending)
+        _positions_cache.put(key, positions)
+    return positions
+
+
+def _to_arrow(window):
+    """
+    Mengubah potongan tabel ke pyarrow.Table. Kolom bertipe campuran diubah ke teks;
+    jika tetap gagal (mis. nama kolom duplikat) atau pyarrow tidak terpasang, DataFrame
+    dikirim apa adanya ke st.dataframe.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return window
+
+    try:
+        return pa.Table.from_pandas(window, preserve_index=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        pass
+
+    mixed = [pos for pos in range(window.shape[1]) if window.dtypes.iloc[pos] == object]
+    window = window.copy()
+    for pos in mixed:
+        column = window.iloc[:, pos]
+        window.isetitem(pos, column.where(column.isna(), column.astype(str)))
+    try:
+        return pa.Table.from_pandas(window, preserve_index=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        return window
+
+
+def render_table(df, key, page_size=DEFAULT_PAGE_SIZE, max_columns=DEFAULT_MAX_COLUMNS, data_key=None, sortable=True,
+                 **dataframe_kwargs):
+    """
+    Pengganti st.dataframe untuk tabel besar: paginasi baris, kelompok kolom untuk tabel lebar,
+    pencarian dan pengurutan di server. Tabel kecil langsung ditampilkan dengan st.dataframe.
+
+    Parameters:
+    df (DataFrame): tabel yang ditampilkan
+    key (str): kunci unik widget kontrol tabel di halaman
+    page_size (int): jumlah baris per halaman
+    max_columns (int): jumlah kolom per kelompok kolom
+    data_key (hashable): identitas isi df yang stabil antar rerun (mis. store['id'] atau hash isi file upload).
+        Jika diberikan, df tidak di-hash ulang untuk kunci cache; jika None, dipakai frame_fingerprint(df)
+    sortable (bool): tampilkan pilihan pengurutan. Matikan untuk tabel teks tampilan (angka yang sudah
+        diformat akan terurut sebagai teks) atau tabel dengan baris statistik yang urutannya harus tetap
+    dataframe_kwargs: argumen tambahan untuk st.dataframe
+    """
+    if len(df) <= page_size and df.shape[1] <= max_columns:
+        st.dataframe(df, **dataframe_kwargs)
+        return
+
+    fingerprint = frame_fingerprint(df) if data_key is None else ("data_key", data_key)
+    column_labels = [str(column) for column in df.columns]
+
+    sort_choice, descending = None, False
+    if sortable:
+        search_col, sort_col, order_col = st.columns([2, 2, 1])
+        with search_col:
+            query = st.text_input("🔎 Cari di tabel", key=f"{key}_query")
+        with sort_col:
+            sort_choice = st.selectbox(
+                "Urutkan berdasarkan",
+                [None] + list(range(df.shape[1])),
+                format_func=lambda pos: "(urutan asli)" if pos is None else column_labels[pos],
+                key=f"{key}_sort",
+            )
+        with order_col:
+            descending = st.checkbox("Menurun", key=f"{key}_desc")
+    else:
+        query = st.text_input("🔎 Cari di tabel", key=f"{key}_query")
+
+    positions = _cached_positions(df, fingerprint, query, sort_choice, not descending)
+    total_rows = len(positions)
+    total_pages = max(1, -(-total_rows // page_size))
+    total_column_pages = max(1, -(-df.shape[1] // max_columns))
+
+    # Jumlah halaman bisa mengecil setelah pencarian; halaman yang tersimpan disesuaikan.
+    # Nilai widget diatur lewat session_state, jadi number_input di bawah tidak diberi value=
+    for widget_key, limit in ((f"{key}_page", total_pages), (f"{key}_colpage", total_column_pages)):
+        if st.session_state.get(widget_key, 1) > limit:
+            st.session_state[widget_key] = limit
+
+    page_col, column_page_col = st.columns(2)
+    with page_col:
+        page = st.number_input(
+            f"Halaman (dari {total_pages})", min_value=1, max_value=total_pages, step=1, key=f"{key}_page"
+        )
+    column_page = 1
+    if total_column_pages > 1:
+        with column_page_col:
+            column_page = st.number_input(
+                f"Kelompok kolom (dari {total_column_pages})",
+                min_value=1, max_value=total_column_pages, step=1, key=f"{key}_colpage",
+            )
+
+    chunk_key = (fingerprint, query, sort_choice, not descending, page, page_size, column_page, max_columns)
+    chunk = _chunk_cache.get(chunk_key)
+    if chunk is None:
+        rows = positions[(page - 1) * page_size:page * page_size]
+        columns = slice((column_page - 1) * max_columns, column_page * max_columns)
+        chunk = _to_arrow(df.iloc[rows, columns])
+        _chunk_cache.put(chunk_key, chunk)
+
+    first_row = (page - 1) * page_size + 1 if total_rows else 0
+    last_row = min(page * page_size, total_rows)
+    first_column = (column_page - 1) * max_columns + 1
+    last_column = min(column_page * max_columns, df.shape[1])
+    filtered_note = f" (hasil pencarian dari {len(df)} baris)" if query else ""
+    st.caption(
+        f"Baris {first_row}–{last_row} dari {total_rows}{filtered_note} · "
+        f"kolom {first_column}–{last_column} dari {df.shape[1]}"
+    )
+    st.dataframe(chunk, **dataframe_kwargs)
@@ -0,0 +1,127 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import combine_duplicate_columns
+
+
+def reference_combine_duplicate_columns(df, mode="gabung"):
+    """
+    Implementasi awal combine_duplicate_columns (combine_first berantai per grup),
+    dipakai sebagai acuan hasil untuk jalur array.
+    """
+    if mode == "pisah":
+        seen = defaultdict(list)
+        for idx, col in enumerate(df.columns):
+            seen[col].append(idx)
+
+        final_data = {}
+        for col, indexes in seen.items():
+            if len(indexes) == 1:
+                final_data[col] = df.iloc[:, indexes[0]]
+            else:
+                combined_series = df.iloc[:, indexes[0]].copy()
+                for i in indexes[1:]:
+                    combined_series = combined_series.combine_first(df.iloc[:, i])
+                final_data[col] = combined_series
+
+        unique_columns = []
+        for col in df.columns:
+            if col not in unique_columns:
+                unique_columns.append(col)
+        return pd.DataFrame({col: final_data[col] for col in unique_columns})
+
+    seen = defaultdict(list)
+    for idx, col in enumerate(df.columns):
+        seen[col].append(idx)
+
+    temp_data = {}
+    for col, indexes in seen.items():
+        if len(indexes) == 1:
+            temp_data[col] = df.iloc[:, indexes[0]]
+        else:
+            combined_series = df.iloc[:, indexes[0]].copy()
+            for i in indexes[1:]:
+                combined_series = combined_series.combine_first(df.iloc[:, i])
+            temp_data[col] = combined_series
+    temp_df = pd.DataFrame(temp_data)
+
+    base_name_map = defaultdict(list)
+    original_order = {}
+    for idx, col in enumerate(temp_df.columns):
+        base_name = re.sub(r"\s*\[.*?\]\s*$", "", col).strip()
+        base_name_map[base_name].append(idx)
+        original_order.setdefault(base_name, idx)
+
+    final_data = {}
+    for base_name in sorted(base_name_map, key=lambda x: original_order[x]):
+        indexes = base_name_map[base_name]
+        combined_series = temp_df.iloc[:, indexes[0]].copy()
+        for i in indexes[1:]:
+            combined_series = combined_series.combine_first(temp_df.iloc[:, i])
+        final_data[base_name] = combined_series
+    return pd.DataFrame(final_data)
+
+
+N_ROWS = 12
+
+
+def make_column(kind, rng):
+    missing = rng.random(N_ROWS) < 0.4
+    if kind == "float":
+        return pd.Series(np.where(missing, np.nan, rng.random(N_ROWS).round(3)))
+    if kind == "int":
+        return pd.Series(rng.integers(0, 100, N_ROWS))
+    if kind == "Int64":
+        values = pd.array(rng.integers(0, 100, N_ROWS), dtype="Int64")
+        values[missing] = pd.NA
+        return pd.Series(values)
+    if kind == "string":
+        values = pd.Series(rng.choice(["a", "b", "c"], N_ROWS), dtype="string")
+        return values.mask(missing)
+    if kind == "str":
+        return pd.Series(rng.choice(["x", "y"], N_ROWS), dtype="str").mask(missing)
+    if kind == "object":
+        choices = np.array(["teks", 1, 2.5, None, np.nan], dtype=object)
+        return pd.Series(rng.choice(choices, N_ROWS), dtype=object)
+    if kind == "all-null-float":
+        return pd.Series(np.full(N_ROWS, np.nan))
+    if kind == "all-null-object":
+        return pd.Series([None] * N_ROWS, dtype=object)
+    raise ValueError(kind)
+
+
+KINDS = ["float", "int", "Int64", "string", "str", "object", "all-null-float", "all-null-object"]
+NAMES = ["A", "A", "B", "B [Teks]", "B [Nilai]", "C [Teks]", "C [Nilai]", "C [Teks]", "D"]
+
+
+def make_frame(kinds, rng):
+    df = pd.concat([make_column(kind, rng) for kind in kinds], axis=1)
+    df.columns = NAMES[:len(kinds)]
+    df.index = rng.permutation(N_ROWS) * 3
+    return df
+
+
+@pytest.mark.parametrize("mode", ["gabung", "pisah"])
+@pytest.mark.parametrize("kind", KINDS)
+def test_uniform_duplicates_match_reference(mode, kind):
+    rng = np.random.default_rng(KINDS.index(kind))
+    for _ in range(20):
+        df = make_frame([kind] * len(NAMES), rng)
+        pd.testing.assert_frame_equal(combine_duplicate_columns(df, mode=mode), reference_combine_duplicate_columns(df, mode=mode))
+
+
+@pytest.mark.parametrize("mode", ["gabung", "pisah"])
+@pytest.mark.parametrize("seed", range(40))
+def test_mixed_duplicates_match_reference(mode, seed):
+    rng = np.random.default_rng(seed)
+    df = make_frame(rng.choice(KINDS, len(NAMES)), rng)
+    pd.testing.assert_frame_equal(combine_duplicate_columns(df, mode=mode), reference_combine_duplicate_columns(df, mode=mode))
+
+
+def test_unknown_mode_returns_input():
+    df = pd.DataFrame([[1, 2]], columns=["A", "A"])
+    assert combine_duplicate_columns(df, mode="lain") is df
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ipc_core import _summary_statistics
+from ipc_stats import compute_statistics, describe_batches
+
+
+def reference_summary_statistics(values):
+    # Statistik Waktu Hancur/Friability versi lama (np.min/np.mean meneruskan NaN)
+    minimum = np.min(values) if values else np.nan
+    maximum = np.max(values) if values else np.nan
+    mean = np.mean(values) if values else np.nan
+    sd = np.std(values, ddof=1) if len(values) > 1 else np.nan
+    rsd = (sd / mean * 100) if mean and mean != 0 else np.nan
+    return [minimum, maximum, mean, sd, rsd]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_summary_statistics_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    values = list(rng.normal(10, 3, int(rng.integers(1, 30))))
+    if seed % 3 == 0:
+        values[int(rng.integers(0, len(values)))] = np.nan
+    if seed % 5 == 0:
+        values = [0.0] * len(values)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = np.array(reference_summary_statistics(values), dtype=float)
+    result = np.array(_summary_statistics(values), dtype=float)
+    assert np.array_equal(result, expected, equal_nan=True)
+
+
+def test_describe_batches_matches_pandas():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(5, 1, (12, 6)), columns=[f"B{i}" for i in range(6)])
+    df = df.mask(rng.random(df.shape) < 0.2)
+
+    stats = describe_batches(df, extras=["MEDIAN", "N"])
+    pd.testing.assert_series_equal(stats.loc["MIN"], df.min(), check_names=False)
+    pd.testing.assert_series_equal(stats.loc["MEAN"], df.mean(), check_names=False)
+    pd.testing.assert_series_equal(stats.loc["SD"], df.std(ddof=1), check_names=False)
+    pd.testing.assert_series_equal(stats.loc["MEDIAN"], df.median(), check_names=False)
+    pd.testing.assert_series_equal(stats.loc["N"], df.count().astype(float), check_names=False)
+
+
+def test_capability_indices():
+    values = np.array([[4.0, 5.0, 6.0, np.nan]])
+    stats = compute_statistics(values, extras=["Cp", "Cpk"], lsl=2.0, usl=10.0)
+    assert stats["Cp"][0] == pytest.approx(8.0 / 6.0)
+    assert stats["Cpk"][0] == pytest.approx(3.0 / 3.0)
+
+    stats = compute_statistics(values, extras=["Cp", "N"], lsl=2.0, usl=10.0, skipna=False)
+    assert np.isnan(stats["Cp"][0]) and np.isnan(stats["MEAN"][0])
+    assert stats["N"][0] == 3
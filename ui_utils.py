@@ -0,0 +1,69 @@
+import streamlit as st
+
+from parse_cache import ParseCache, content_key
+from table_view import frame_fingerprint
+
+# Fungsi tampilan Streamlit yang dipakai bersama oleh halaman-halaman
+
+# File download yang sudah dibuat, dikunci dengan hash isi DataFrame sumbernya
+_export_cache = ParseCache(max_entries=16)
+
+
+def render_messages(messages):
+    """
+    Menampilkan pesan hasil parser inti (list tuple (level, teks)) dengan st.error/st.warning/st.info.
+    """
+    renderers = {"error": st.error, "warning": st.warning, "info": st.info, "success": st.success}
+    for level, text in messages:
+        renderers.get(level, st.write)(text)
+
+
+def upload_key(uploaded_file, parser_name):
+    """
+    Kunci isi file upload (lihat parse_cache.content_key) yang dihitung sekali per upload.
+    Upload dikenali dari file_id Streamlit; kuncinya disimpan di session_state sehingga
+    rerun berikutnya tidak membaca dan meng-hash ulang file.
+    """
+    state_key = f"_upload_key_{parser_name}"
+    stored = st.session_state.get(state_key)
+    if stored is None or stored[0] != uploaded_file.file_id:
+        stored = (uploaded_file.file_id, content_key(uploaded_file, parser_name))
+        st.session_state[state_key] = stored
+    return stored[1]
+
+
+def lazy_download_button(label, build, file_name, mime, key, frames=None, options=(), data_key=None, **button_kwargs):
+    """
+    Tombol download yang filenya baru dibuat saat diminta. Selama file belum ada di cache,
+    yang tampil hanya tombol "Siapkan"; setelah diklik, build() dipanggil sekali dan hasilnya
+    disimpan dengan kunci isi data (+ options), sehingga rerun berikutnya tidak
+    membuat ulang file yang sama.
+
+    Parameters:
+    label (str): label tombol download
+    build (callable): fungsi tanpa argumen yang mengembalikan isi file (bytes atau str)
+    file_name (str): nama file download
+    mime (str): tipe MIME file
+    key (str): kunci unik tombol di halaman
+    frames (list): DataFrame sumber file; hanya dipakai (di-hash) jika data_key None
+    options (tuple): opsi lain yang memengaruhi isi file (mis. nama sheet)
+    data_key (hashable): identitas isi data yang stabil antar rerun (mis. store['id']). Jika diberikan,
+        tidak ada DataFrame yang di-hash setiap rerun
+    button_kwargs: argumen tambahan untuk st.download_button
+    """
+    if data_key is not None:
+        data_identity = ("data_key", data_key)
+    elif frames is not None:
+        data_identity = tuple(frame_fingerprint(df) for df in frames)
+    else:
+        raise ValueError("lazy_download_button membutuhkan frames atau data_key")
+    cache_key = (key, data_identity, options)
+    data = _export_cache.get(cache_key)
+    if data is None:
+        if not st.button(f"⚙️ Siapkan {file_name}", key=f"{key}_prepare"):
+            return
+        with st.spinner(f"Menyiapkan {file_name}..."):
+            data = build()
+        _export_cache.put(cache_key, data)
+
+    st.download_button(label=label, data=data, file_name=file_name, mime=mime, key=key, **button_kwargs)
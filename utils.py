@@ -1,7 +1,87 @@
 import pandas as pd
+import numpy as np
 import re
 from collections import defaultdict
 
+def _clean_column_name(name):
+    # Nama dasar kolom tanpa sufiks seperti [Teks] / [Nilai]
+    return re.sub(r"\s*\[.*?\]\s*$", "", name).strip()
+
+
+def _group_positions(names):
+    """
+    Mengelompokkan posisi kolom berdasarkan nama, urut sesuai kemunculan pertama.
+    """
+    groups = defaultdict(list)
+    for idx, name in enumerate(names):
+        groups[name].append(idx)
+    return groups
+
+
+def _combine_first_chain(df, subgroups):
+    """
+    combine_first berantai seperti implementasi awal: sub-grup digabung dulu, lalu hasilnya
+    digabung antar sub-grup. Dipakai untuk grup dengan tipe kolom berbeda agar konversi
+    tipenya sama persis (mis. Int64 -> Float64 -> object).
+    """
+    combined = None
+    for members in subgroups:
+        inner = df.iloc[:, members[0]].copy()
+        for pos in members[1:]:
+            inner = inner.combine_first(df.iloc[:, pos])
+        combined = inner if combined is None else combined.combine_first(inner)
+    return combined
+
+
+def _coalesce_groups(df, groups):
+    """
+    Menggabungkan setiap grup kolom menjadi satu kolom: nilai tidak kosong pertama
+    yang menang, setara combine_first berantai. Jika semua kosong, penanda kosong
+    dari kolom terakhir yang dipakai.
+
+    groups: dict nama hasil -> list sub-grup posisi kolom. Sub-grup digabung dulu
+    (kolom bernama persis sama), lalu hasilnya digabung antar sub-grup.
+    Grup yang semua kolomnya bertipe sama diproses sekaligus dari satu array 2-D;
+    grup bertipe campuran memakai _combine_first_chain.
+    """
+    column_dtypes = df.dtypes.tolist()
+    uniform = {
+        name: len({column_dtypes[pos] for members in subgroups for pos in members}) == 1
+        for name, subgroups in groups.items()
+    }
+    dup_positions = [
+        pos for name, subgroups in groups.items() if uniform[name] and sum(map(len, subgroups)) > 1
+        for members in subgroups for pos in members
+    ]
+
+    if dup_positions:
+        # Satu array 2-D untuk semua kolom duplikat bertipe sama, diproses sekaligus per grup
+        dup_block = df.iloc[:, dup_positions]
+        values = dup_block.to_numpy(dtype=object)
+        present = dup_block.notna().to_numpy()
+        block_col = {pos: i for i, pos in enumerate(dup_positions)}
+        rows = np.arange(len(df))
+
+    final_data = {}
+    for name, subgroups in groups.items():
+        positions = [pos for members in subgroups for pos in members]
+        if len(positions) == 1:
+            final_data[name] = df.iloc[:, positions[0]]
+            continue
+        if not uniform[name]:
+            final_data[name] = _combine_first_chain(df, subgroups)
+            continue
+
+        cols = np.array([block_col[pos] for pos in positions])
+        group_present = present[:, cols]
+        chosen = group_present.argmax(axis=1)
+        chosen[~group_present.any(axis=1)] = len(cols) - 1
+        combined = values[rows, cols[chosen]]
+        final_data[name] = pd.Series(combined, index=df.index, dtype=column_dtypes[positions[0]])
+
+    return final_data
+
+
 def combine_duplicate_columns(df, mode="gabung"):
     """
     Menggabungkan atau memisahkan kolom duplikat berdasarkan mode yang dipilih.
@@ -18,88 +98,198 @@ def combine_duplicate_columns(df, mode="gabung"):
     if mode == "pisah":
         # Mode pisah: Hanya tangani kolom yang benar-benar duplikat (nama persis sama)
         # Kolom dengan sufiks [Teks] dan [Nilai] tetap terpisah seperti kondisi asli
-        
-        new_columns = []
-        seen = defaultdict(list)
-
-        # Kelompokkan kolom berdasarkan nama yang persis sama
-        for idx, col in enumerate(df.columns):
-            seen[col].append(idx)
-
-        final_data = {}
-
-        # Proses setiap grup kolom
-        for col, indexes in seen.items():
-            if len(indexes) == 1:
-                # Kolom unik, langsung ambil
-                final_data[col] = df.iloc[:, indexes[0]]
-            else:
-                # Kolom duplikat (nama persis sama), gabungkan datanya
-                combined_series = df.iloc[:, indexes[0]].copy()
-                for i in indexes[1:]:
-                    combined_series = combined_series.combine_first(df.iloc[:, i])
-                final_data[col] = combined_series
-
-        # Kembalikan dengan urutan kolom asli (tanpa duplikat)
-        unique_columns = []
-        for col in df.columns:
-            if col not in unique_columns:
-                unique_columns.append(col)
-        
-        return pd.DataFrame({col: final_data[col] for col in unique_columns})
-    
+        groups = {name: [positions] for name, positions in _group_positions(df.columns).items()}
+
     elif mode == "gabung":
-        # Mode gabung: Lakukan penggabungan kolom duplikat + gabungkan kolom dengan sufiks
-        
-        # Tahap 1: Tangani kolom yang benar-benar duplikat (nama persis sama)
-        seen = defaultdict(list)
-        for idx, col in enumerate(df.columns):
-            seen[col].append(idx)
-
-        temp_data = {}
-        for col, indexes in seen.items():
-            if len(indexes) == 1:
-                temp_data[col] = df.iloc[:, indexes[0]]
-            else:
-                combined_series = df.iloc[:, indexes[0]].copy()
-                for i in indexes[1:]:
-                    combined_series = combined_series.combine_first(df.iloc[:, i])
-                temp_data[col] = combined_series
-
-        temp_df = pd.DataFrame(temp_data)
-
-        # Tahap 2: Gabungkan kolom yang nama dasarnya sama (hilangkan [teks], [nilai])
-        def clean_column_name(name):
-            return re.sub(r"\s*\[.*?\]\s*$", "", name).strip()
-
-        base_name_map = defaultdict(list)
-        original_order = {}  # Untuk menjaga urutan berdasarkan kemunculan pertama
-        
-        for idx, col in enumerate(temp_df.columns):
-            base_name = clean_column_name(col)
-            base_name_map[base_name].append(idx)
-            
-            # Simpan posisi kemunculan pertama dari base name ini
-            if base_name not in original_order:
-                original_order[base_name] = idx
-
-        final_data = {}
-
-        # Proses berdasarkan urutan kemunculan pertama
-        for base_name in sorted(base_name_map.keys(), key=lambda x: original_order[x]):
-            indexes = base_name_map[base_name]
-            
-            if len(indexes) == 1:
-                final_data[base_name] = temp_df.iloc[:, indexes[0]]
-            else:
-                # Gabungkan kolom dengan base name yang sama
-                combined_series = temp_df.iloc[:, indexes[0]].copy()
-                for i in indexes[1:]:
-                    combined_series = combined_series.combine_first(temp_df.iloc[:, i])
-                final_data[base_name] = combined_series
-
-        return pd.DataFrame(final_data)
-    
+        # Mode gabung: kolom duplikat (nama persis sama) + kolom dengan nama dasar sama
+        # (hilangkan [teks], [nilai]) digabung dalam satu langkah. Urutan di dalam grup:
+        # nama persis per kemunculan pertama, lalu posisi-posisinya
+        exact_groups = _group_positions(df.columns)
+
+        groups = defaultdict(list)
+        for name, positions in exact_groups.items():
+            groups[_clean_column_name(name)].append(positions)
+
     else:
         # Mode tidak dikenali, kembalikan dataframe asli tanpa perubahan
         return df
+
+    # Urutan kolom hasil mengikuti kemunculan pertama (dict menjaga urutan penyisipan)
+    return pd.DataFrame(_coalesce_groups(df, groups))
+
+
+# Pola angka desimal (pemisah titik atau koma) untuk deteksi kolom numerik
+DECIMAL_LIKE_PATTERN = r'^\d+([.,]\d+)?$'
+
+
+def _strings_to_float(values):
+    """
+    Mengkonversi array string menjadi float64 dengan hasil persis seperti float().
+    String yang tidak valid menjadi NaN.
+    """
+    values = np.asarray(values, dtype=object)
+    try:
+        return values.astype(np.float64)
+    except (ValueError, TypeError):
+        pass
+
+    result = np.full(len(values), np.nan)
+
+    # to_numeric hanya menyaring kandidat; nilainya tetap dihitung dengan float() agar presisinya sama
+    parsed = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").notna().to_numpy()
+    try:
+        result[parsed] = values[parsed].astype(np.float64)
+    except (ValueError, TypeError):
+        parsed[:] = False
+
+    for i in np.flatnonzero(~parsed):
+        try:
+            result[i] = float(values[i])
+        except (ValueError, TypeError):
+            pass
+
+    return result
+
+
+def float_values(series):
+    """
+    Versi vektor dari float(nilai) per sel.
+    
+    Returns:
+    tuple (array float64, array bool valid). valid False untuk nilai yang membuat
+    float() gagal (ValueError/TypeError); nilainya NaN.
+    """
+    values = series.to_numpy(dtype=object)
+    numbers = _strings_to_float(values)
+    valid = ~np.isnan(numbers)
+
+    # NaN hasil float() sendiri (mis. teks "nan") tetap dianggap valid
+    for i in np.flatnonzero(~valid):
+        try:
+            float(values[i])
+            valid[i] = True
+        except (ValueError, TypeError):
+            pass
+
+    return numbers, valid
+
+
+def coerce_decimal_columns(df, threshold=0.3):
+    """
+    Mendeteksi kolom yang sebagian besar berisi angka desimal dan mengkonversinya ke float.
+    
+    Parameters:
+    df (DataFrame): DataFrame yang akan diproses
+    threshold (float): proporsi minimal nilai berbentuk angka agar kolom dikonversi
+    
+    Returns:
+    DataFrame: DataFrame dengan kolom numerik yang sudah dikonversi.
+               Nilai yang tidak valid di kolom tersebut menjadi pd.NA
+    """
+    for pos in range(df.shape[1]):
+        column = df.iloc[:, pos]
+        sample = column.dropna().astype(str).str.strip()
+        if len(sample) == 0:
+            continue
+
+        decimal_like = sample.str.match(DECIMAL_LIKE_PATTERN).to_numpy(dtype=bool)
+        if decimal_like.sum() / len(sample) <= threshold:
+            continue
+
+        numbers = _strings_to_float(sample[decimal_like].str.replace(",", ".", regex=False))
+        if decimal_like.all():
+            converted = pd.Series(numbers, index=sample.index)
+        else:
+            converted_values = np.full(len(sample), pd.NA, dtype=object)
+            converted_values[decimal_like] = numbers
+            converted = pd.Series(converted_values, index=sample.index, dtype=object)
+
+        df.isetitem(pos, converted.reindex(df.index))
+
+    return df
+
+
+def clean_numeric_series(series):
+    """
+    Membersihkan dan mengkonversi seluruh nilai series menjadi float sekaligus.
+    String angka yang tergabung (mis. "12.3412.35") diambil angka pertamanya,
+    nilai yang tidak bisa dikonversi menjadi NaN.
+    """
+    if pd.api.types.infer_dtype(series, skipna=False) in ("floating", "integer", "mixed-integer-float", "boolean"):
+        return pd.Series(series.to_numpy(dtype=np.float64, na_value=np.nan), index=series.index)
+
+    values = series.to_numpy(dtype=object)
+    result = np.full(len(values), np.nan)
+
+    is_number = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values))
+    is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+
+    if is_number.any():
+        result[is_number] = values[is_number].astype(np.float64)
+
+    if is_str.any():
+        str_positions = np.flatnonzero(is_str)
+        strings = pd.Series(values[is_str], dtype=object)
+
+        # Angka tergabung: panjang > 7, lebih dari satu titik, tanpa spasi
+        merged = (
+            (strings.str.len() > 7)
+            & (strings.str.count(r"\.") > 1)
+            & ~strings.str.contains(" ", regex=False)
+        ).to_numpy(dtype=bool)
+
+        if merged.any():
+            first_number = strings[merged].str.extract(r"(-?\d+\.?\d*)", expand=False)
+            found = first_number.notna().to_numpy()
+            merged_positions = str_positions[merged]
+            result[merged_positions[found]] = _strings_to_float(first_number[found])
+
+        result[str_positions[~merged]] = _strings_to_float(strings[~merged])
+
+    return pd.Series(result, index=series.index)
+
+
+def compact_batch_blocks(df, batch_column="Nomor Batch"):
+    """
+    Menggeser nilai yang tidak kosong ke atas di dalam setiap blok batch, urutannya tetap.
+    Satu blok dimulai dari baris dengan Nomor Batch terisi sampai sebelum batch berikutnya.
+    Baris sebelum batch pertama tidak diubah.
+    
+    Parameters:
+    df (DataFrame): DataFrame yang akan diproses
+    batch_column (str): nama kolom penanda awal blok batch
+    
+    Returns:
+    DataFrame: DataFrame dengan index dan kolom yang sama, nilai kosong berada di bawah tiap blok
+    """
+    if batch_column not in df.columns or df.empty:
+        return df
+
+    block_id = df[batch_column].notna().cumsum().to_numpy()
+    in_block = (block_id > 0)[:, None]
+    is_empty = df.isna().to_numpy() & in_block
+
+    # Urutkan stabil per kolom berdasarkan (blok, kosong): nilai terisi naik ke atas bloknya
+    sort_key = block_id[:, None] * 2 + is_empty
+    order = np.argsort(sort_key, axis=0, kind="stable")
+
+    # Sel yang nilainya dipindah ke atas menjadi None; sel yang memang kosong tetap berisi
+    # penanda kosong aslinya (None/NaN/pd.NA), sama seperti penggeseran per sel sebelumnya
+    ends_empty = np.take_along_axis(is_empty, order, axis=0)
+    vacated = ~is_empty & ends_empty
+    stays_empty = is_empty & ends_empty
+
+    compacted = {}
+    for pos in range(df.shape[1]):
+        original = df.iloc[:, pos].array
+        values = original.take(order[:, pos])
+        if df.dtypes.iloc[pos] == object and (vacated[:, pos].any() or stays_empty[:, pos].any()):
+            values = values.to_numpy(copy=True)
+            values[stays_empty[:, pos]] = original.to_numpy()[stays_empty[:, pos]]
+            values[vacated[:, pos]] = None
+        # dtype setiap kolom dipertahankan (tanpa inferensi ulang dari isi kolom)
+        compacted[pos] = pd.Series(values, index=df.index, dtype=df.dtypes.iloc[pos])
+
+    result = pd.DataFrame(compacted, index=df.index)
+    result.columns = df.columns
+    return result